@@ -0,0 +1,330 @@
+"""
+Benchmarks for storage, import/export, MovieManager and the table view,
+run against synthetic watchlists.
+
+    python benchmark.py                          # 1k, 10k and 100k movies
+    python benchmark.py --sizes 1000 --repeat 5
+    python benchmark.py --output new.json --baseline old.json
+    python benchmark.py --sizes 1000 --fetch     # also time metadata lookups
+
+Every benchmark runs --repeat times on fresh data and reports the fastest
+and median wall-clock time.  --output saves the results as JSON, and
+--baseline compares against a file saved earlier: the exit status is 1 if
+anything got slower by more than --tolerance (and by more than --noise
+seconds, so sub-millisecond jitter never fails a run).
+
+--fetch adds the metadata lookup benchmarks, run against the local
+stand-in servers in fake_servers.py (with --fetch-latency added to every
+response) and a scratch metadata cache, so they need no network.
+
+The GUI benchmarks use Qt's offscreen platform and a throwaway QSettings
+location, so no window appears and the real settings are left alone.  The
+databases live in a temporary directory; watchlist.db is never touched.
+"""
+
+import argparse
+import datetime
+import gc
+import itertools
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import database
+from database import init_db, save_movies, load_movies, search_titles, export_to_json, import_from_json
+from models import Movie
+from movie_manager import MovieManager
+from version import __version__
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+DEFAULT_REPEAT = 3
+DEFAULT_TOLERANCE = 0.25  # fraction slower than the baseline that counts as a regression
+DEFAULT_NOISE = 0.005     # seconds; smaller differences are never regressions
+
+_WORDS = ("the", "last", "night", "king", "city", "dark", "love", "river", "house", "war",
+          "star", "secret", "summer", "ghost", "road", "empire", "silent", "blue", "story", "game")
+_PLATFORMS = ("Netflix", "Prime Video", "Disney+", "HBO Max", "Apple TV+", "Cinema", "")
+
+
+def synthetic_movies(count, seed=0):
+    """count distinct Movies with realistic-looking fields (some left blank)."""
+    rng = random.Random(seed)
+    today = datetime.date.today()
+    movies = []
+    for i in range(count):
+        minutes = rng.randint(20, 200)
+        is_series = rng.random() < 0.3
+        watch = today + datetime.timedelta(days=rng.randint(-60, 365))
+        movies.append(Movie(
+            f"https://www.imdb.com/title/tt{1000000 + i:07d}/",
+            " ".join(rng.choice(_WORDS) for _ in range(rng.randint(1, 4))).title(),
+            f"{minutes // 60}h {minutes % 60}m({minutes} min)" if rng.random() < 0.95 else "",
+            watch.strftime("%d/%m/%Y") if rng.random() < 0.8 else "",
+            rng.choice(_PLATFORMS),
+            str(rng.randint(1, 250)) if is_series else "-",
+            f"{rng.uniform(1, 10):.1f}" if rng.random() < 0.9 else "-",
+        ))
+    return movies
+
+
+class Runner:
+    """Times benchmarks and collects their results."""
+
+    def __init__(self, repeat):
+        self.repeat = repeat
+        self.results = {}
+
+    def run(self, name, size, fn, setup=None):
+        """Time fn(setup()) repeat times; setup is not included in the time."""
+        runs = []
+        for _ in range(self.repeat):
+            arg = setup() if setup else None
+            gc.collect()
+            start = time.perf_counter()
+            fn(arg)
+            runs.append(time.perf_counter() - start)
+        key = f"{name}@{size}"
+        self.results[key] = {"min": min(runs), "median": statistics.median(runs), "runs": runs}
+        print(f"  {name:<32} {min(runs) * 1000:10.2f} ms  (median {statistics.median(runs) * 1000:.2f})")
+
+
+def bench_storage(runner, size, movies, workdir):
+    def fresh_db():
+        database.DB_PATH = os.path.join(workdir, f"fresh_{time.perf_counter_ns()}.db")
+        init_db()
+
+    def filled_db():
+        database.DB_PATH = filled
+        return [Movie(*row) for row in load_movies()]
+
+    runner.run("save_movies (new database)", size, lambda _: save_movies(movies), fresh_db)
+
+    filled = os.path.join(workdir, "filled.db")
+    database.DB_PATH = filled
+    init_db()
+    save_movies(movies)
+
+    runner.run("save_movies (unchanged)", size, lambda current: save_movies(current), filled_db)
+
+    edits = itertools.count()
+
+    def edit_one_percent(current):
+        label = f"Edited {next(edits)}"  # differs every run, so each save has work to do
+        for movie in current[::100]:
+            movie.platform = label
+        save_movies(current)
+    runner.run("save_movies (1% edited)", size, edit_one_percent, filled_db)
+
+    database.DB_PATH = filled
+    runner.run("load_movies", size, lambda _: load_movies())
+    runner.run("load_movies (by date)", size, lambda _: load_movies(order_by="date"))
+    runner.run("Movie(*row) for loaded rows", size,
+               lambda rows: [Movie(*row) for row in rows], lambda: load_movies())
+    runner.run("search_titles", size, lambda _: search_titles("night"))
+
+    export_path = os.path.join(workdir, "export.json")
+    runner.run("export_to_json", size, lambda _: export_to_json(movies, export_path))
+    runner.run("import_from_json", size, lambda _: import_from_json(export_path))
+
+
+def bench_manager(runner, size, movies):
+    ops = min(size, 10000)
+    rng = random.Random(1)
+    rows = [rng.randrange(size) for _ in range(ops)]
+
+    def filled():
+        manager = MovieManager()
+        manager.movies = list(movies)
+        return manager
+
+    def add_all(_):
+        manager = MovieManager()
+        for movie in movies:
+            manager.add_movie(movie)
+    runner.run("MovieManager.add_movie", size, add_all)
+
+    def move(manager):
+        for row in rows:
+            manager.move_up(row)
+            manager.move_down(row)
+    runner.run(f"MovieManager.move_up/down x{ops}", size, move, filled)
+
+    def edit(manager):
+        for row in rows:
+            manager.edit_movie(row, movies[row])
+    runner.run(f"MovieManager.edit_movie x{ops}", size, edit, filled)
+
+    removals = min(size, 1000)
+
+    def remove_front(manager):
+        for _ in range(removals):
+            manager.remove_movie(0)
+    runner.run(f"MovieManager.remove_movie x{removals}", size, remove_front, filled)
+
+
+def bench_gui(runner, size, movies, workdir):
+    from PySide6.QtCore import QSettings, Qt
+    from PySide6.QtWidgets import QApplication
+
+    import gui
+
+    app = QApplication.instance() or QApplication([sys.argv[0]])
+    QSettings.setDefaultFormat(QSettings.IniFormat)
+    QSettings.setPath(QSettings.IniFormat, QSettings.UserScope, os.path.join(workdir, "settings"))
+
+    database.DB_PATH = os.path.join(workdir, "filled.db")
+    windows = []
+
+    def open_window(_):
+        windows.append(gui.MovieWatchlistApp())
+    runner.run("MovieWatchlistApp() (load + sort)", size, open_window)
+
+    window = windows[-1]
+
+    def show(_):
+        window.show()
+        app.processEvents()
+    runner.run("show + first paint", size, show, window.hide)
+
+    for col, label in ((gui.COL_TITLE, "Title"), (gui.COL_DAYS_LEFT, "Days Left"),
+                       (gui.COL_RATING, "IMDb")):
+        runner.run(f"sort by {label}", size,
+                   lambda _, col=col: window.model.sort(col, Qt.DescendingOrder),
+                   lambda col=col: window.model.sort(col, Qt.AscendingOrder))
+
+    for w in windows:
+        w.hide()
+        w.deleteLater()
+    app.processEvents()
+
+
+def bench_fetch(runner, workdir, latency):
+    import imdb_fetcher
+    from fake_servers import FakeServers
+
+    saved = (imdb_fetcher.OMDB_URL, imdb_fetcher.TVMAZE_URL, imdb_fetcher.IMDB_URL,
+             imdb_fetcher._cache, imdb_fetcher._omdb_keys)
+    imdb_fetcher._cache = imdb_fetcher._MetadataCache(os.path.join(workdir, "metadata_cache.db"),
+                                                      imdb_fetcher._MEMORY_CACHE_SIZE)
+    batch = [f"https://www.imdb.com/title/tt{3000000 + i}/" for i in range(50)]
+
+    def fresh_keys():
+        # Key health carries over between lookups; start each benchmark even
+        imdb_fetcher._omdb_keys = imdb_fetcher._KeyScheduler(imdb_fetcher._OMDB_KEYS)
+
+    def fetch(url, refresh=True):
+        return lambda _: imdb_fetcher.fetch_movie_info(url, refresh=refresh)
+
+    servers = FakeServers(latency=latency).start()
+    try:
+        servers.install()
+        print(f"\nmetadata lookups (fake servers, {latency * 1000:.0f} ms latency)")
+        runner.run("fetch_movie_info movie", 1, fetch("https://www.imdb.com/title/tt0111161/"), fresh_keys)
+        runner.run("fetch_movie_info series", 1, fetch("https://www.imdb.com/title/tt0903747/"), fresh_keys)
+        runner.run("fetch_movie_info cached", 1,
+                   fetch("https://www.imdb.com/title/tt0903747/", refresh=False), fresh_keys)
+        runner.run("fetch_many", len(batch),
+                   lambda _: list(imdb_fetcher.fetch_many(batch, refresh=True)), fresh_keys)
+
+        servers.configure("omdb", bad_keys=set(imdb_fetcher._OMDB_KEYS[:-1]))
+        runner.run("fetch_movie_info, 3 of 4 keys bad", 1,
+                   fetch("https://www.imdb.com/title/tt0111161/"), fresh_keys)
+        servers.configure("omdb", bad_keys=set())
+
+        servers.configure("tvmaze", error_rate=1.0)
+        runner.run("episodes via IMDb fallback", 1,
+                   fetch("https://www.imdb.com/title/tt0944947/"), fresh_keys)
+        servers.configure("tvmaze", error_rate=0.0)
+    finally:
+        servers.stop()
+        imdb_fetcher.set_base_urls(*saved[:3])
+        imdb_fetcher._cache, imdb_fetcher._omdb_keys = saved[3:]
+
+
+def compare(results, baseline, tolerance, noise):
+    """Print the changes against baseline; return the names of regressions."""
+    regressions = []
+    print(f"\nCompared with baseline (tolerance {tolerance:.0%}):")
+    for key, result in results.items():
+        old = baseline.get(key)
+        if old is None:
+            continue
+        new_t, old_t = result["min"], old["min"]
+        change = (new_t - old_t) / old_t if old_t else 0.0
+        slower = new_t > old_t * (1 + tolerance) and new_t - old_t > noise
+        flag = "  REGRESSION" if slower else ""
+        print(f"  {key:<40} {old_t * 1000:10.2f} -> {new_t * 1000:10.2f} ms  ({change:+.0%}){flag}")
+        if slower:
+            regressions.append(key)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES,
+                        help="watchlist sizes to generate (default: %(default)s)")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT,
+                        help="runs per benchmark (default: %(default)s)")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="allowed slowdown before failing (default: %(default)s)")
+    parser.add_argument("--noise", type=float, default=DEFAULT_NOISE,
+                        help="ignore slowdowns smaller than this many seconds (default: %(default)s)")
+    parser.add_argument("--no-gui", action="store_true", help="skip the table view benchmarks")
+    parser.add_argument("--fetch", action="store_true",
+                        help="also time metadata lookups against fake_servers.py")
+    parser.add_argument("--fetch-latency", type=float, default=0.0,
+                        help="seconds the fake servers add to each response (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    runner = Runner(args.repeat)
+    saved_db_path = database.DB_PATH
+    workdir = tempfile.mkdtemp(prefix="watchlist_bench_")
+    try:
+        for size in args.sizes:
+            print(f"\n{size} movies")
+            movies = synthetic_movies(size)
+            bench_storage(runner, size, movies, workdir)
+            bench_manager(runner, size, movies)
+            if not args.no_gui:
+                bench_gui(runner, size, movies, workdir)
+        if args.fetch:
+            bench_fetch(runner, workdir, args.fetch_latency)
+    finally:
+        database.DB_PATH = saved_db_path
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "version": __version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "repeat": args.repeat,
+        "results": runner.results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(runner.results, baseline, args.tolerance, args.noise)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s)")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
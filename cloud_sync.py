@@ -1,6 +1,12 @@
 """
 Google Drive sync for watchlist.db.
 
+Changes travel as small journal files (see database.save_movies and
+apply_journal): every device uploads its new journal entries on close and
+merges the other devices' files on startup.  The full database file is only
+downloaded by a device that has no local copy yet, and re-uploaded every
+SNAPSHOT_EVERY pushes so that copy stays reasonably fresh.
+
 Setup (one-time):
   1. Go to https://console.cloud.google.com
   2. Create a project → Enable "Google Drive API"
@@ -9,21 +15,47 @@ Setup (one-time):
   5. Rename the downloaded file to  credentials.json  and put it next to the exe
   6. First run: a browser tab opens → sign in → grant access → token.json is saved
   7. From then on the app syncs silently with no browser prompt.
+
+The Google client libraries are heavy to import, so they are only loaded by
+the functions that talk to Drive; is_configured() and the constants here are
+free to use at startup.
 """
 
+import hashlib
 import io
+import json
 import os
+import shutil
+import subprocess
 import sys
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager
 
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
-from googleapiclient.http import MediaFileUpload, MediaIoBaseDownload
+from database import journal_since, max_journal_seq, prune_journal
 
 DRIVE_FILE_ID = "1GOlrITdRU87fWTSPPIj5MrEEJuQ9Rgyn"
 _SCOPES = ["https://www.googleapis.com/auth/drive"]
 
+# Resumable upload tuning.  Drive requires chunks in multiples of 256 KB.
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+UPLOAD_RETRIES = 8          # consecutive failed chunks before giving up
+UPLOAD_BACKOFF = 1.0        # seconds; doubles per consecutive failure
+_MAX_BACKOFF = 60.0
+_RETRY_STATUSES = (429, 500, 502, 503, 504)
+HTTP_TIMEOUT = 30           # seconds per Drive request, so a stall can't hang a sync
+
+# Journal files live next to the database file on Drive, one per push:
+#   watchlist-journal-<device>-<first seq>-<last seq>.json
+_JOURNAL_PREFIX = "watchlist-journal-"
+SNAPSHOT_EVERY = 20  # journal pushes between full database uploads
+_COMPACTED = "compacted"  # in place of "<first seq>-<last seq>" in a compacted file's name
+
+# Command-line switch main.py recognises to run a detached sync
+SYNC_ARG = "--sync"
+
 
 def _app_dir():
     if getattr(sys, "frozen", False):
@@ -39,44 +71,509 @@ def _token_path():
     return os.path.join(_app_dir(), "token.json")
 
 
+def _state_path():
+    return os.path.join(_app_dir(), "sync_state.json")
+
+
+# sync_state.json is read and updated by the GUI thread, the startup sync
+# worker and the detached sync process.  _state_locked() serializes them:
+# an RLock for this process's threads, plus an OS lock on a file next to
+# the state file for the other process.
+_state_lock = threading.RLock()
+_state_lock_depth = 0  # nesting of _state_locked() in the thread holding _state_lock
+
+
+def _lock_file(f):
+    if sys.platform == "win32":
+        import msvcrt
+        while True:
+            try:
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                return
+            except OSError:
+                pass  # LK_LOCK gives up after ~10 s; keep waiting
+    else:
+        import fcntl
+        fcntl.flock(f, fcntl.LOCK_EX)
+
+
+def _unlock_file(f):
+    if sys.platform == "win32":
+        import msvcrt
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+    else:
+        import fcntl
+        fcntl.flock(f, fcntl.LOCK_UN)
+
+
+@contextmanager
+def _state_locked():
+    """Hold the sync state lock; nest it around a read-modify-write."""
+    global _state_lock_depth
+    with _state_lock:
+        if _state_lock_depth:
+            _state_lock_depth += 1
+            try:
+                yield
+            finally:
+                _state_lock_depth -= 1
+            return
+        with open(_state_path() + ".lock", "a+b") as f:
+            _lock_file(f)
+            _state_lock_depth = 1
+            try:
+                yield
+            finally:
+                _state_lock_depth = 0
+                _unlock_file(f)
+
+
+def _load_state():
+    with _state_locked():
+        try:
+            with open(_state_path(), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+
+def _save_state(**values):
+    """Merge values into sync_state.json.
+
+    The file is rewritten through a temporary file and os.replace, so a
+    reader never sees it half-written.
+    """
+    path = _state_path()
+    with _state_locked():
+        state = _load_state()
+        state.update(values)
+        fd, tmp_path = tempfile.mkstemp(prefix="sync_state_", suffix=".tmp",
+                                        dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(state, f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+
+def _file_md5(path):
+    """Hex MD5 of a local file (what Drive reports as md5Checksum), or None."""
+    digest = hashlib.md5()
+    try:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+    except OSError:
+        return None
+    return digest.hexdigest()
+
+
+def _device_id():
+    with _state_locked():
+        device = _load_state().get("device_id")
+        if not device:
+            device = uuid.uuid4().hex[:12]
+            _save_state(device_id=device)
+    return device
+
+
+def _journal_folder(service):
+    """Drive folder holding the database file, where journal files go."""
+    folder = _load_state().get("folder_id")
+    if not folder:
+        folder = service.files().get(fileId=DRIVE_FILE_ID, fields="parents").execute()["parents"][0]
+        _save_state(folder_id=folder)
+    return folder
+
+
+def _remote_metadata(service):
+    return service.files().get(fileId=DRIVE_FILE_ID, fields="md5Checksum,modifiedTime").execute()
+
+
 def is_configured():
     """Return True if credentials.json or token.json is present."""
     return os.path.exists(_credentials_path()) or os.path.exists(_token_path())
 
 
+def is_signed_in():
+    """Return True if token.json lets Drive be used without a browser sign-in."""
+    try:
+        with open(_token_path(), "r", encoding="utf-8") as f:
+            return bool(json.load(f).get("refresh_token"))
+    except (OSError, ValueError):
+        return False
+
+
+def sign_in():
+    """Run the interactive Google sign-in and save token.json.
+
+    Opens a browser and blocks until the user is done, so call it from the
+    GUI thread — never from a worker that shutdown waits on.
+    """
+    from google_auth_oauthlib.flow import InstalledAppFlow
+
+    flow = InstalledAppFlow.from_client_secrets_file(_credentials_path(), _SCOPES)
+    creds = flow.run_local_server(port=0)
+    with open(_token_path(), "w") as f:
+        f.write(creds.to_json())
+
+
+_service = None
+
+
 def _get_service():
+    """Return the Drive client, building it once per process.
+
+    The client's authorized HTTP object keeps its connection to Google open
+    and refreshes the token itself, so reusing it saves a TLS handshake (and
+    a token refresh) on every download/upload after the first.  Never signs
+    in interactively: without a usable token.json (see sign_in) this raises
+    RuntimeError.
+    """
+    global _service
+    if _service is not None:
+        return _service
+
+    import httplib2
+    from google.auth.transport.requests import Request
+    from google.oauth2.credentials import Credentials
+    from google_auth_httplib2 import AuthorizedHttp
+    from googleapiclient.discovery import build
+
     creds = None
     token_path = _token_path()
-    creds_path = _credentials_path()
 
     if os.path.exists(token_path):
         creds = Credentials.from_authorized_user_file(token_path, _SCOPES)
 
     if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            creds.refresh(Request())
-        else:
-            flow = InstalledAppFlow.from_client_secrets_file(creds_path, _SCOPES)
-            creds = flow.run_local_server(port=0)
+        if not (creds and creds.expired and creds.refresh_token):
+            raise RuntimeError("not signed in to Google Drive")
+        creds.refresh(Request())
         with open(token_path, "w") as f:
             f.write(creds.to_json())
 
-    return build("drive", "v3", credentials=creds)
+    http = AuthorizedHttp(creds, http=httplib2.Http(timeout=HTTP_TIMEOUT))
+    _service = build("drive", "v3", http=http)
+    return _service
+
+
+def download_db(local_path, dest_path=None):
+    """Overwrite local_path with the file from Google Drive.
 
+    Only the file's metadata is fetched when the Drive copy has not changed
+    since the last sync, or already matches local_path (same MD5).  In the
+    first case local_path is kept even if it has edits that were never
+    uploaded.
+
+    The download goes to a temporary file that replaces local_path only once
+    complete, so a failed transfer never leaves a truncated database.  Pass
+    dest_path to have the new copy written there instead and leave swapping
+    it in to the caller.  Returns True if the file was downloaded.
+    """
+    from googleapiclient.http import MediaIoBaseDownload
 
-def download_db(local_path):
-    """Overwrite local_path with the file from Google Drive."""
     service = _get_service()
+    remote = _remote_metadata(service)
+    remote_md5 = remote.get("md5Checksum")
+    if remote_md5 and os.path.exists(local_path):
+        if remote_md5 == _load_state().get("md5"):
+            return False
+        if remote_md5 == _file_md5(local_path):
+            _save_state(md5=remote_md5, modifiedTime=remote.get("modifiedTime"))
+            return False
+    dest_path = dest_path or local_path
+    tmp_path = dest_path + ".part"
     request = service.files().get_media(fileId=DRIVE_FILE_ID)
-    with io.FileIO(local_path, "wb") as fh:
-        downloader = MediaIoBaseDownload(fh, request)
-        done = False
-        while not done:
-            _, done = downloader.next_chunk()
+    try:
+        with io.FileIO(tmp_path, "wb") as fh:
+            downloader = MediaIoBaseDownload(fh, request)
+            done = False
+            while not done:
+                _, done = downloader.next_chunk()
+        os.replace(tmp_path, dest_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    if dest_path == local_path:
+        adopt_downloaded_db(local_path, local_path)
+    return True
+
+
+def adopt_downloaded_db(downloaded_path, local_path):
+    """Move a database fetched by download_db into place as local_path.
+
+    Only now is the file recorded as in sync with Drive, so a download the
+    caller throws away is fetched again next time.  Journal entries that came
+    inside the downloaded file were written by other devices, so they are
+    marked as already pushed.
+    """
+    if downloaded_path != local_path:
+        os.replace(downloaded_path, local_path)
+    _save_state(md5=_file_md5(local_path), pushed_seq=max_journal_seq(local_path))
+
+
+def sync_pending(local_path):
+    """True if local_path has journal entries not yet pushed to Drive."""
+    return max_journal_seq(local_path) > _load_state().get("pushed_seq", 0)
+
+
+def push_journal(local_path):
+    """Upload the journal entries of local_path not yet pushed, as one small
+    Drive file.  Returns the number of entries sent."""
+    state = _load_state()
+    entries = journal_since(state.get("pushed_seq", 0), local_path)
+    if not entries:
+        return 0
+    from googleapiclient.http import MediaIoBaseUpload
+
+    service = _get_service()
+    name = f"{_JOURNAL_PREFIX}{_device_id()}-{entries[0]['seq']:010d}-{entries[-1]['seq']:010d}.json"
+    media = MediaIoBaseUpload(io.BytesIO(json.dumps(entries).encode("utf-8")),
+                              mimetype="application/json", resumable=False)
+    service.files().create(
+        body={"name": name, "parents": [_journal_folder(service)]}, media_body=media, fields="id"
+    ).execute()
+    with _state_locked():
+        _save_state(pushed_seq=entries[-1]["seq"],
+                    pushes_since_snapshot=_load_state().get("pushes_since_snapshot", 0) + 1)
+    return len(entries)
+
+
+def _list_journal_files(service, query=""):
+    """Journal files in the Drive folder, oldest first, as dicts with id,
+    name and createdTime; query narrows the listing further."""
+    query = (f"'{_journal_folder(service)}' in parents and "
+             f"name contains '{_JOURNAL_PREFIX}' and trashed = false" + query)
+    files = []
+    page_token = None
+    while True:
+        result = service.files().list(
+            q=query, orderBy="createdTime", pageToken=page_token,
+            fields="nextPageToken, files(id, name, createdTime)"
+        ).execute()
+        files.extend(result.get("files", []))
+        page_token = result.get("nextPageToken")
+        if not page_token:
+            return files
+
+
+def fetch_remote_journal():
+    """Download the journal files other devices pushed since the last merge.
+
+    Only files created at or after the newest one already merged are listed
+    (state "journal_after"); "applied_files" holds the ids merged at exactly
+    that time.  Returns (entries, files); pass files to mark_journal_applied
+    once the entries have been merged with database.apply_journal.  files
+    includes this device's own new files, which carry nothing to merge.
+    """
+    service = _get_service()
+    own_prefix = f"{_JOURNAL_PREFIX}{_device_id()}-"
+    state = _load_state()
+    after = state.get("journal_after")
+    applied = set(state.get("applied_files", []))
+    entries, files = [], []
+    for f in _list_journal_files(service, f" and createdTime >= '{after}'" if after else ""):
+        if f["id"] in applied:
+            continue
+        if not f["name"].startswith(own_prefix):
+            data = service.files().get_media(fileId=f["id"]).execute()
+            entries.extend(json.loads(data))
+        files.append((f["id"], f["createdTime"]))
+    return entries, files
+
+
+def mark_journal_applied(files):
+    """Record the (id, createdTime) pairs from fetch_remote_journal as merged."""
+    if not files:
+        return
+    with _state_locked():
+        state = _load_state()
+        after = state.get("journal_after") or ""
+        # Drive's RFC 3339 timestamps compare correctly as strings
+        newest = max([after] + [created for _, created in files])
+        applied = state.get("applied_files", []) if newest == after else []
+        applied += [file_id for file_id, created in files if created == newest]
+        _save_state(journal_after=newest, applied_files=applied)
+
+
+def _compact_entries(entries):
+    """The entries that still matter once replayed last-writer-wins: the
+    newest add, reorder and remove of each title, and the newest edit of
+    each of its fields (edits made at the same time share one entry)."""
+    latest = {}
+    for entry in sorted(entries, key=lambda e: e["ts"]):
+        if entry["op"] == "edit":
+            for field, value in entry["payload"].items():
+                latest[(entry["imdb_id"], "edit", field)] = dict(entry, payload={field: value})
+        else:
+            latest[(entry["imdb_id"], entry["op"])] = entry
+    merged = {}
+    for entry in latest.values():
+        if entry["op"] == "edit":
+            same = merged.get((entry["imdb_id"], "edit", entry["ts"]))
+            if same is not None:
+                same["payload"].update(entry["payload"])
+                continue
+            entry = dict(entry, payload=dict(entry["payload"]))
+            merged[(entry["imdb_id"], "edit", entry["ts"])] = entry
+        else:
+            merged[(entry["imdb_id"], entry["op"])] = entry
+    return sorted(merged.values(), key=lambda e: e["ts"])
+
 
+def compact_remote_journal():
+    """Fold the journal files the last uploaded snapshot already covers into
+    one compacted file, and delete them.
 
-def upload_db(local_path):
-    """Replace the Google Drive file with the current local_path."""
+    Covered means created before the snapshot and either pushed by this
+    device or already merged into its database.  Devices that have not
+    merged them yet get the same result from the compacted file, so the
+    folder stays small without anyone missing a change.  Returns the number
+    of files removed.
+    """
+    state = _load_state()
+    snapshot_time = state.get("modifiedTime")
+    if not snapshot_time:
+        return 0
     service = _get_service()
-    media = MediaFileUpload(local_path, mimetype="application/x-sqlite3", resumable=False)
-    service.files().update(fileId=DRIVE_FILE_ID, media_body=media).execute()
+    device = _device_id()
+    own_prefix = f"{_JOURNAL_PREFIX}{device}-"
+    merged_upto = state.get("journal_after") or ""
+    covered = [
+        f for f in _list_journal_files(service, f" and createdTime < '{snapshot_time}'")
+        if f["name"].startswith(own_prefix) or f["createdTime"] <= merged_upto
+    ]
+    if len(covered) < 2:
+        return 0
+    entries = []
+    for f in covered:
+        entries.extend(json.loads(service.files().get_media(fileId=f["id"]).execute()))
+
+    from googleapiclient.http import MediaIoBaseUpload
+
+    name = f"{own_prefix}{_COMPACTED}-{int(time.time())}.json"
+    media = MediaIoBaseUpload(io.BytesIO(json.dumps(_compact_entries(entries)).encode("utf-8")),
+                              mimetype="application/json", resumable=False)
+    service.files().create(
+        body={"name": name, "parents": [_journal_folder(service)]}, media_body=media, fields="id"
+    ).execute()
+    for f in covered:
+        service.files().delete(fileId=f["id"]).execute()
+    return len(covered)
+
+
+def prune_pushed_journal():
+    """Drop local journal entries that have already been pushed."""
+    pushed = _load_state().get("pushed_seq", 0)
+    if pushed:
+        prune_journal(pushed)
+
+
+def upload_db(local_path, progress_callback=None, chunk_size=UPLOAD_CHUNK_SIZE,
+              retries=UPLOAD_RETRIES):
+    """Replace the Google Drive file with the current local_path.
+
+    Skipped without any network traffic when the file is unchanged since
+    the last sync (same MD5 as recorded in sync_state.json), and after one
+    metadata request when Drive already holds identical content.
+
+    The upload is resumable and sent in chunk_size pieces.  A chunk that
+    fails with a network error or a retryable HTTP status is resent after an
+    exponential backoff; the upload continues where it stopped rather than
+    starting over.  progress_callback, if given, receives a 0-100 percentage
+    after each chunk.  Returns True if the file was uploaded.
+    """
+    local_md5 = _file_md5(local_path)
+    if local_md5 == _load_state().get("md5"):
+        return False
+    import httplib2
+    from googleapiclient.errors import HttpError
+    from googleapiclient.http import MediaFileUpload
+
+    service = _get_service()
+    remote = _remote_metadata(service)
+    if remote.get("md5Checksum") == local_md5:
+        _save_state(md5=local_md5, modifiedTime=remote.get("modifiedTime"))
+        return False
+    media = MediaFileUpload(local_path, mimetype="application/x-sqlite3",
+                            chunksize=chunk_size, resumable=True)
+    request = service.files().update(
+        fileId=DRIVE_FILE_ID, media_body=media, fields="md5Checksum,modifiedTime"
+    )
+    remote = None
+    failures = 0
+    while remote is None:
+        try:
+            status, remote = request.next_chunk()
+        except (HttpError, httplib2.HttpLib2Error, OSError) as e:
+            if isinstance(e, HttpError) and e.resp.status not in _RETRY_STATUSES:
+                raise
+            failures += 1
+            if failures > retries:
+                raise
+            time.sleep(min(UPLOAD_BACKOFF * 2 ** (failures - 1), _MAX_BACKOFF))
+            continue
+        failures = 0
+        if status and progress_callback:
+            progress_callback(int(status.progress() * 100))
+    if progress_callback:
+        progress_callback(100)
+    _save_state(md5=remote.get("md5Checksum", local_md5), modifiedTime=remote.get("modifiedTime"))
+    return True
+
+
+def sync_detached(local_path):
+    """Push local changes from a separate process that outlives this one.
+
+    A snapshot of the file is handed to a background copy of the app
+    (main.py --sync <snapshot>, see run_detached_sync), so closing the
+    window never waits on the network.  Nothing is started when there are no
+    unpushed changes.  Returns True if a sync process was launched.
+    """
+    if not sync_pending(local_path):
+        return False
+    fd, snapshot = tempfile.mkstemp(prefix="watchlist_sync_", suffix=".db")
+    os.close(fd)
+    shutil.copyfile(local_path, snapshot)
+
+    if getattr(sys, "frozen", False):
+        cmd = [sys.executable, SYNC_ARG, snapshot]
+    else:
+        cmd = [sys.executable, os.path.join(_app_dir(), "main.py"), SYNC_ARG, snapshot]
+    kwargs = {}
+    if sys.platform == "win32":
+        kwargs["creationflags"] = subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP
+    else:
+        kwargs["start_new_session"] = True
+
+    from updater import child_env
+    subprocess.Popen(cmd, env=child_env(), cwd=_app_dir(), close_fds=True,
+                     stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                     stderr=subprocess.DEVNULL, **kwargs)
+    return True
+
+
+def run_detached_sync(snapshot):
+    """Entry point of the process started by sync_detached.
+
+    Pushes the new journal entries; every SNAPSHOT_EVERY pushes the whole
+    database is uploaded as well, for devices that start from scratch, and
+    the journal files it covers are compacted.
+    """
+    try:
+        push_journal(snapshot)
+        if _load_state().get("pushes_since_snapshot", 0) >= SNAPSHOT_EVERY:
+            upload_db(snapshot)
+            _save_state(pushes_since_snapshot=0)
+            compact_remote_journal()
+    except Exception as e:
+        print(f"Cloud sync upload failed: {e}")
+    finally:
+        try:
+            os.remove(snapshot)
+        except OSError:
+            pass
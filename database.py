@@ -1,8 +1,52 @@
 import sqlite3
 import json
+import re
+import time
+import unicodedata
+import uuid
+from datetime import date
+
+from models import Movie, imdb_id
+
+DB_PATH = "watchlist.db"
+
+_COLUMNS = ("url", "title", "length", "date", "platform", "episodes", "imdb_rating")
+_FIELD_OF = dict(zip(_COLUMNS, Movie.FIELDS))  # column → Movie attribute
+# Typed copies of the text columns above, kept for sorting/filtering in SQL
+_TYPED_COLUMNS = ("runtime_minutes", "watch_day", "rating", "episode_count")
+
+# Bumped whenever init_db needs to rewrite existing rows (PRAGMA user_version)
+_SCHEMA_VERSION = 2
+
+# load_movies(order_by=...) keys → SQL expression.  Empty values sort last.
+_ORDER_BY = {
+    "position": "position",
+    "title": "title COLLATE NOCASE",
+    "length": "runtime_minutes",
+    "episodes": "episode_count",
+    "rating": "rating",
+    "date": "watch_day",
+    "platform": "platform COLLATE NOCASE",
+}
+
+
+def _imdb_id(url):
+    """Default identity for a movie row: the IMDb tt id, or the raw URL."""
+    return imdb_id(url) or (url or "")
+
+
+def _typed_values(movie):
+    """(runtime_minutes, watch_day, rating, episode_count) for a Movie.
+
+    watch_day is an ISO yyyy-mm-dd string so SQLite orders it correctly and
+    its date functions work on it.
+    """
+    watch_day = date.fromordinal(movie.watch_ordinal).isoformat() if movie.watch_ordinal else None
+    return movie.runtime_minutes, watch_day, movie.rating, movie.episode_count
+
 
 def init_db():
-    conn = sqlite3.connect("watchlist.db")
+    conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
     cursor.execute("""
         CREATE TABLE IF NOT EXISTS movies (
@@ -13,38 +57,437 @@ def init_db():
             date TEXT,
             platform TEXT DEFAULT '',
             episodes TEXT DEFAULT '-',
-            imdb_rating TEXT DEFAULT '-'
+            imdb_rating TEXT DEFAULT '-',
+            imdb_id TEXT,
+            position REAL,
+            runtime_minutes INTEGER,
+            watch_day TEXT,
+            rating REAL,
+            episode_count INTEGER,
+            updated_at REAL DEFAULT 0,
+            moved_at REAL DEFAULT 0,
+            fetched_at REAL DEFAULT 0,
+            field_times TEXT
+        )
+    """)
+    # Change journal: one entry per add/edit/remove/reorder, shipped to other
+    # devices by cloud_sync and merged there with apply_journal
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS journal (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            ts REAL NOT NULL,
+            op TEXT NOT NULL,
+            imdb_id TEXT NOT NULL,
+            payload TEXT
+        )
+    """)
+    # When each title was last removed, so an older edit can't resurrect it
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS tombstones (
+            imdb_id TEXT PRIMARY KEY,
+            removed_at REAL NOT NULL
         )
     """)
     # Migrate existing databases that don't have these columns yet
-    for col, default in [("platform", "''"), ("episodes", "'-'"), ("imdb_rating", "'-'")]:
+    for col, decl in [("platform", "TEXT DEFAULT ''"), ("episodes", "TEXT DEFAULT '-'"),
+                      ("imdb_rating", "TEXT DEFAULT '-'"), ("imdb_id", "TEXT"),
+                      ("position", "REAL"), ("runtime_minutes", "INTEGER"),
+                      ("watch_day", "TEXT"), ("rating", "REAL"), ("episode_count", "INTEGER"),
+                      ("updated_at", "REAL DEFAULT 0"), ("moved_at", "REAL DEFAULT 0"),
+                      ("fetched_at", "REAL DEFAULT 0"), ("field_times", "TEXT")]:
         try:
-            cursor.execute(f"ALTER TABLE movies ADD COLUMN {col} TEXT DEFAULT {default}")
+            cursor.execute(f"ALTER TABLE movies ADD COLUMN {col} {decl}")
         except sqlite3.OperationalError:
             pass  # column already exists
+
+    # Backfill identity and order for rows written by the old DELETE-all saver.
+    # Row order used to be implied by the autoincrement id.  Nothing is
+    # dropped: a repeated title, and every row without a tt id, gets an
+    # identity of its own ("<tt id or url>#<row id>").
+    cursor.execute("SELECT id, url FROM movies WHERE imdb_id IS NULL OR position IS NULL ORDER BY id")
+    pending = cursor.fetchall()
+    if pending:
+        cursor.execute("SELECT imdb_id FROM movies WHERE imdb_id IS NOT NULL")
+        seen = {row[0] for row in cursor.fetchall()}
+        cursor.execute("SELECT COALESCE(MAX(position), -1) FROM movies")
+        position = cursor.fetchone()[0] + 1
+        for row_id, url in pending:
+            key = _imdb_id(url)
+            if key in seen or not imdb_id(url):
+                key = f"{key}#{row_id}"
+            seen.add(key)
+            cursor.execute("UPDATE movies SET imdb_id = ?, position = ? WHERE id = ?",
+                           (key, position, row_id))
+            position += 1
+
+    # Fill the typed columns from the text ones for rows saved before they existed
+    if cursor.execute("PRAGMA user_version").fetchone()[0] < _SCHEMA_VERSION:
+        cursor.execute(f"SELECT id, {', '.join(_COLUMNS)} FROM movies")
+        cursor.executemany(
+            f"UPDATE movies SET {', '.join(f'{col} = ?' for col in _TYPED_COLUMNS)} WHERE id = ?",
+            [_typed_values(Movie(*row[1:])) + (row[0],) for row in cursor.fetchall()]
+        )
+        cursor.execute(f"PRAGMA user_version = {_SCHEMA_VERSION}")
+
+    cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_movies_imdb_id ON movies (imdb_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_movies_position ON movies (position)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_movies_watch_day ON movies (watch_day)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_movies_platform ON movies (platform)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_movies_fetched_at ON movies (fetched_at)")
+    _init_search(cursor)
     conn.commit()
     conn.close()
 
+def _init_search(cursor):
+    """Create the FTS5 title index and the triggers that keep it in sync.
+
+    Skipped silently if this SQLite build has no FTS5; search_titles then
+    falls back to LIKE.
+    """
+    exists = cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'movies_fts'"
+    ).fetchone()
+    if exists:
+        return
+    try:
+        cursor.execute("""
+            CREATE VIRTUAL TABLE movies_fts USING fts5(
+                title, content='movies', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+            )
+        """)
+    except sqlite3.OperationalError:
+        return  # no FTS5 in this SQLite build
+    cursor.executescript("""
+        CREATE TRIGGER IF NOT EXISTS movies_fts_ai AFTER INSERT ON movies BEGIN
+            INSERT INTO movies_fts (rowid, title) VALUES (new.id, new.title);
+        END;
+        CREATE TRIGGER IF NOT EXISTS movies_fts_ad AFTER DELETE ON movies BEGIN
+            INSERT INTO movies_fts (movies_fts, rowid, title) VALUES ('delete', old.id, old.title);
+        END;
+        CREATE TRIGGER IF NOT EXISTS movies_fts_au AFTER UPDATE OF title ON movies BEGIN
+            INSERT INTO movies_fts (movies_fts, rowid, title) VALUES ('delete', old.id, old.title);
+            INSERT INTO movies_fts (rowid, title) VALUES (new.id, new.title);
+        END;
+    """)
+    cursor.execute("INSERT INTO movies_fts (movies_fts) VALUES ('rebuild')")
+
 def save_movies(movies):
-    conn = sqlite3.connect("watchlist.db")
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM movies")
+    """Persist the watchlist, writing only the rows that changed.
+
+    Rows are matched on movie.key (assigned here on first save: the IMDb
+    id, or a unique variant of it) and ordered by movie.position, not by
+    their place in movies, so sorting the list changes nothing and moving
+    one movie rewrites one row; movies without a position are appended in
+    list order.  New and edited rows are upserted,
+    rows no longer in the list are deleted, and untouched rows are left as
+    they are.  Every change is also appended to the journal table; an edit
+    records only the fields that changed, stamped with when they were
+    edited (movie.edited_at), and those times are kept per field
+    (field_times) for apply_journal; the stamps are cleared once saved.
+    Everything happens in one transaction.  Returns True if the database
+    was modified.
+    """
+    next_position = max((m.position for m in movies if m.position is not None), default=-1) + 1
+    wanted = {}
     for movie in movies:
-        cursor.execute(
-            "INSERT INTO movies (url, title, length, date, platform, episodes, imdb_rating) VALUES (?, ?, ?, ?, ?, ?, ?)",
-            (movie.url, movie.title, movie.length, movie.watch_date, movie.platform, movie.episodes, movie.imdb_rating)
-        )
-    conn.commit()
-    conn.close()
+        if movie.position is None:
+            movie.position = next_position
+            next_position += 1
+        key = movie.key or _imdb_id(movie.url)
+        if key in wanted or (movie.key is None and not imdb_id(movie.url)):
+            # A repeated title or a URL without a tt id is never dropped; it
+            # gets an identity of its own, kept on the movie from now on
+            key = f"{_imdb_id(movie.url)}#{uuid.uuid4().hex[:8]}"
+        movie.key = key
+        wanted[key] = (movie.position, movie.url, movie.title, movie.length, movie.watch_date,
+                       movie.platform, movie.episodes, movie.imdb_rating) + _typed_values(movie)
+    edited_at = {movie.key: movie.edited_at for movie in movies}
+
+    now = time.time()
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        with conn:
+            cursor = conn.cursor()
+            columns = ("position",) + _COLUMNS + _TYPED_COLUMNS
+            cursor.execute(
+                f"SELECT imdb_id, updated_at, moved_at, field_times, {', '.join(columns)} FROM movies"
+            )
+            existing = {row[0]: row[1:] for row in cursor.fetchall()}
+
+            removed = [key for key in existing if key not in wanted]
+            changed = []
+            journal = [(now, "remove", key, None) for key in removed]
+            for key, values in wanted.items():
+                old = existing.get(key)
+                if old is not None and old[3:] == values:
+                    continue
+                fields = dict(zip(_COLUMNS, values[1:1 + len(_COLUMNS)]))
+                if old is None:
+                    journal.append((now, "add", key, json.dumps(dict(fields, position=values[0]))))
+                    updated_at = moved_at = now
+                    times = dict.fromkeys(_COLUMNS, now)
+                else:
+                    updated_at, moved_at = old[0], old[1]
+                    times = json.loads(old[2]) if old[2] else {}
+                    # One edit entry per edit time, holding just the fields
+                    # changed then; fields edited on other devices are untouched
+                    edits = {}
+                    for col, old_value in zip(_COLUMNS, old[4:4 + len(_COLUMNS)]):
+                        if fields[col] != old_value:
+                            ts = edited_at[key].get(_FIELD_OF[col]) or now
+                            edits.setdefault(ts, {})[col] = fields[col]
+                            times[col] = ts
+                    for ts, edit in sorted(edits.items()):
+                        journal.append((ts, "edit", key, json.dumps(edit)))
+                        updated_at = max(updated_at, ts)
+                    if old[3] != values[0]:
+                        journal.append((now, "reorder", key, json.dumps({"position": values[0]})))
+                        moved_at = now
+                changed.append((key, updated_at, moved_at, json.dumps(times)) + values)
+
+            if removed:
+                cursor.executemany("DELETE FROM movies WHERE imdb_id = ?", [(key,) for key in removed])
+                cursor.executemany(
+                    "INSERT OR REPLACE INTO tombstones (imdb_id, removed_at) VALUES (?, ?)",
+                    [(key, now) for key in removed]
+                )
+            if changed:
+                all_columns = ("updated_at", "moved_at", "field_times") + columns
+                cursor.executemany(
+                    f"INSERT INTO movies (imdb_id, {', '.join(all_columns)}) "
+                    f"VALUES (?, {', '.join('?' for _ in all_columns)}) "
+                    "ON CONFLICT (imdb_id) DO UPDATE SET "
+                    + ", ".join(f"{col} = excluded.{col}" for col in all_columns),
+                    changed
+                )
+                cursor.executemany("DELETE FROM tombstones WHERE imdb_id = ?",
+                                   [(row[0],) for row in changed])
+            if journal:
+                cursor.executemany(
+                    "INSERT INTO journal (ts, op, imdb_id, payload) VALUES (?, ?, ?, ?)", journal
+                )
+    finally:
+        conn.close()
+    for movie in movies:
+        movie.edited_at.clear()
+    return bool(removed or changed)
+
+def journal_since(seq, path=None):
+    """Journal entries after seq, oldest first, as dicts with seq, ts, op,
+    imdb_id and payload (a dict, or None for removals)."""
+    conn = sqlite3.connect(path or DB_PATH)
+    try:
+        rows = conn.execute(
+            "SELECT seq, ts, op, imdb_id, payload FROM journal WHERE seq > ? ORDER BY seq", (seq,)
+        ).fetchall()
+    finally:
+        conn.close()
+    return [
+        {"seq": row[0], "ts": row[1], "op": row[2], "imdb_id": row[3],
+         "payload": json.loads(row[4]) if row[4] else None}
+        for row in rows
+    ]
+
+def max_journal_seq(path=None):
+    conn = sqlite3.connect(path or DB_PATH)
+    try:
+        return conn.execute("SELECT COALESCE(MAX(seq), 0) FROM journal").fetchone()[0]
+    finally:
+        conn.close()
+
+def prune_journal(upto_seq):
+    """Drop journal entries up to upto_seq (already shipped elsewhere)."""
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        with conn:
+            conn.execute("DELETE FROM journal WHERE seq <= ?", (upto_seq,))
+    finally:
+        conn.close()
+
+def apply_journal(entries):
+    """Merge journal entries from another device into the movies table.
+
+    Conflicts resolve last-writer-wins per field: an add or edit only
+    overwrites the fields whose time in field_times (updated_at for rows
+    saved before that existed) is older than the entry, so two devices
+    editing different fields of one title both keep their change.  Position
+    is weighed against moved_at and removals against the tombstones table.
+    Applying the same entries twice changes nothing, and merged changes are
+    not journaled again.  Returns the number of entries that changed
+    something.
+    """
+    applied = 0
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        with conn:
+            cursor = conn.cursor()
+            for entry in sorted(entries, key=lambda e: e["ts"]):
+                ts, op, key, payload = entry["ts"], entry["op"], entry["imdb_id"], entry["payload"]
+                row = cursor.execute(
+                    f"SELECT updated_at, moved_at, field_times, {', '.join(_COLUMNS)} "
+                    "FROM movies WHERE imdb_id = ?", (key,)
+                ).fetchone()
+                tomb = cursor.execute(
+                    "SELECT removed_at FROM tombstones WHERE imdb_id = ?", (key,)
+                ).fetchone()
 
-def load_movies():
-    conn = sqlite3.connect("watchlist.db")
+                if op in ("add", "edit"):
+                    if tomb and tomb[0] >= ts:
+                        continue
+                    if row:
+                        times = json.loads(row[2]) if row[2] else {}
+                        won = {col: payload[col] for col in _COLUMNS
+                               if col in payload and ts > times.get(col, row[0])}
+                        if not won:
+                            continue
+                        times.update(dict.fromkeys(won, ts))
+                        values = dict(zip(_COLUMNS, row[3:]), **won)
+                        values = tuple(values[col] for col in _COLUMNS)
+                        values += _typed_values(Movie(*values))
+                        assigned = ", ".join(f"{col} = ?" for col in _COLUMNS + _TYPED_COLUMNS)
+                        cursor.execute(
+                            f"UPDATE movies SET {assigned}, updated_at = ?, field_times = ? "
+                            "WHERE imdb_id = ?",
+                            values + (max(row[0], ts), json.dumps(times), key)
+                        )
+                    elif any(col not in payload for col in ("url", "title")):
+                        continue  # an edit of a title removed here; nothing to rebuild it from
+                    else:
+                        values = tuple(payload.get(col, "") for col in _COLUMNS)
+                        values += _typed_values(Movie(*values))
+                        position = payload.get("position")
+                        if position is None:
+                            position = cursor.execute(
+                                "SELECT COALESCE(MAX(position), -1) + 1 FROM movies").fetchone()[0]
+                        all_columns = (("imdb_id", "position", "updated_at", "moved_at", "field_times")
+                                       + _COLUMNS + _TYPED_COLUMNS)
+                        cursor.execute(
+                            f"INSERT INTO movies ({', '.join(all_columns)}) "
+                            f"VALUES ({', '.join('?' for _ in all_columns)})",
+                            (key, position, ts, ts, json.dumps(dict.fromkeys(_COLUMNS, ts))) + values
+                        )
+                    cursor.execute("DELETE FROM tombstones WHERE imdb_id = ?", (key,))
+                elif op == "remove":
+                    if tomb and tomb[0] >= ts:
+                        continue
+                    if row and row[0] > ts:
+                        continue  # edited here after it was removed there — keep it
+                    cursor.execute("DELETE FROM movies WHERE imdb_id = ?", (key,))
+                    cursor.execute("INSERT OR REPLACE INTO tombstones (imdb_id, removed_at) VALUES (?, ?)",
+                                   (key, ts))
+                elif op == "reorder":
+                    if not row or row[1] >= ts:
+                        continue
+                    cursor.execute("UPDATE movies SET position = ?, moved_at = ? WHERE imdb_id = ?",
+                                   (payload["position"], ts, key))
+                else:
+                    continue
+                applied += 1
+    finally:
+        conn.close()
+    return applied
+
+def load_movies(order_by="position", descending=False, platform=None, limit=None, offset=0):
+    """Return movie rows as
+    (url, title, length, date, platform, episodes, imdb_rating, key, position),
+    ready for Movie(*row); key and position are the row's identity and place
+    in the saved order (see save_movies).
+
+    Rows come back in list order by default.  order_by may be any key of
+    _ORDER_BY to have SQLite sort on the typed columns (rows without a value
+    last); platform restricts to one platform, and limit/offset page through
+    the result.
+    """
+    direction = "DESC" if descending else "ASC"
+    expr = _ORDER_BY[order_by]
+    sql = f"SELECT {', '.join(_COLUMNS)}, imdb_id, position FROM movies"
+    params = []
+    if platform is not None:
+        sql += " WHERE platform = ?"
+        params.append(platform)
+    sql += f" ORDER BY {expr.split()[0]} IS NULL, {expr} {direction}, position"
+    if limit is not None:
+        sql += " LIMIT ? OFFSET ?"
+        params += [limit, offset]
+    conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
-    cursor.execute("SELECT url, title, length, date, platform, episodes, imdb_rating FROM movies")
+    cursor.execute(sql, params)
     rows = cursor.fetchall()
     conn.close()
     return rows
 
+def stale_urls(older_than, limit):
+    """URLs of up to limit movies whose metadata was last fetched before
+    older_than (a time.time() value), stalest first.  Rows never refreshed
+    have fetched_at 0."""
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        rows = conn.execute(
+            "SELECT url FROM movies WHERE fetched_at < ? ORDER BY fetched_at, position LIMIT ?",
+            (older_than, limit)
+        ).fetchall()
+    finally:
+        conn.close()
+    return [row[0] for row in rows]
+
+def mark_fetched(urls, when=None):
+    """Record that the metadata of these movies was just fetched.
+
+    fetched_at is bookkeeping for the background refresh only: save_movies
+    leaves it alone and it is not journaled.
+    """
+    when = time.time() if when is None else when
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        with conn:
+            conn.executemany("UPDATE movies SET fetched_at = ? WHERE url = ?",
+                             [(when, url) for url in urls])
+    finally:
+        conn.close()
+
+def _fold(text):
+    """Lower-case text with accents removed, as the FTS5 tokenizer sees it."""
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch)).casefold()
+
+
+def title_matches(query, title):
+    """The search_titles rule for one title held in memory: every word of
+    query starts a word of title (case and accents ignored)."""
+    title_words = re.findall(r"\w+", _fold(title or ""))
+    return all(any(word.startswith(q) for word in title_words)
+               for q in re.findall(r"\w+", _fold(query)))
+
+
+def search_titles(query):
+    """Return the set of URLs of saved movies whose title matches query.
+
+    Every word in query must match the start of a word in the title, so
+    "star wa" finds "Star Wars".  Only rows already saved are searched.
+    """
+    words = query.split()
+    if not words:
+        return set()
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        match = " ".join('"{}"*'.format(word.replace('"', '""')) for word in words)
+        try:
+            rows = conn.execute(
+                "SELECT url FROM movies WHERE id IN "
+                "(SELECT rowid FROM movies_fts WHERE movies_fts MATCH ?)",
+                (match,)
+            ).fetchall()
+        except sqlite3.OperationalError:
+            # No FTS5 table — substring match on every word instead
+            rows = conn.execute(
+                "SELECT url FROM movies WHERE "
+                + " AND ".join("title LIKE ? ESCAPE '\\'" for _ in words),
+                ["%" + re.sub(r"([%_\\])", r"\\\1", word) + "%" for word in words]
+            ).fetchall()
+    finally:
+        conn.close()
+    return {row[0] for row in rows}
+
 def export_to_json(movies, filepath):
     data = [
         {
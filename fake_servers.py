@@ -0,0 +1,318 @@
+"""
+Local stand-ins for OMDb, TVMaze and IMDb, for measuring and exercising
+imdb_fetcher without the network.
+
+One threaded HTTP server answers under three prefixes (/omdb, /tvmaze and
+/imdb) from the fixtures in FIXTURES.  By default any other tt id gets a
+made-up movie or series, so synthetic watchlists can be fetched too.  For
+each service you can add latency, a share of failing requests (HTTP 500)
+and a rate limit; OMDb keys can also be given a quota or marked invalid.
+
+From Python:
+
+    with FakeServers(latency=0.05) as servers:
+        servers.install()                      # imdb_fetcher now uses them
+        servers.configure("tvmaze", error_rate=1.0)   # force the IMDb fallback
+        ...
+
+From the command line (then point the app at it with the printed
+environment variables, see imdb_fetcher.OMDB_URL and friends):
+
+    python fake_servers.py --port 8765 --latency 0.2 --error-rate 0.1
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+SERVICES = ("omdb", "tvmaze", "imdb")
+
+# Recorded responses, trimmed to the fields imdb_fetcher reads.  "seasons"
+# lists each season's episodeOrder (None for a season still being
+# announced, whose episodes are then listed individually).
+FIXTURES = {
+    "tt0111161": {"Type": "movie", "Title": "The Shawshank Redemption",
+                  "Runtime": "142 min", "imdbRating": "9.3"},
+    "tt0468569": {"Type": "movie", "Title": "The Dark Knight",
+                  "Runtime": "152 min", "imdbRating": "9.0"},
+    "tt0903747": {"Type": "series", "Title": "Breaking Bad", "Runtime": "49 min",
+                  "imdbRating": "9.5", "tvmaze_id": 169, "status": "Ended",
+                  "seasons": [7, 13, 13, 13, 16]},
+    "tt0944947": {"Type": "series", "Title": "Game of Thrones", "Runtime": "57 min",
+                  "imdbRating": "9.2", "tvmaze_id": 82, "status": "Ended",
+                  "seasons": [10, 10, 10, 10, 10, 10, 7, 6]},
+    "tt11280740": {"Type": "series", "Title": "Severance", "Runtime": "55 min",
+                   "imdbRating": "8.7", "tvmaze_id": 44933, "status": "Running",
+                   "seasons": [9, None], "aired": 10},
+    # Not on TVMaze: episode counts only come from the IMDb page
+    "tt9900001": {"Type": "series", "Title": "Local Access Hour", "Runtime": "30 min",
+                  "imdbRating": "6.1", "tvmaze_id": None, "episodes": 12},
+}
+
+
+def _synthetic(imdb_id):
+    """A made-up but stable title for any tt id not in FIXTURES."""
+    number = int(imdb_id[2:])
+    rng = random.Random(number)
+    if number % 3:
+        return {"Type": "movie", "Title": f"Synthetic Movie {number}",
+                "Runtime": f"{rng.randint(70, 180)} min", "imdbRating": f"{rng.uniform(4, 9):.1f}"}
+    return {"Type": "series", "Title": f"Synthetic Series {number}",
+            "Runtime": f"{rng.randint(20, 60)} min", "imdbRating": f"{rng.uniform(4, 9):.1f}",
+            "tvmaze_id": number, "status": rng.choice(["Running", "Ended"]),
+            "seasons": [rng.randint(6, 24) for _ in range(rng.randint(1, 8))]}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # Set per server by FakeServers
+    servers = None
+
+    def log_message(self, format, *args):
+        pass  # keep benchmark output clean
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        service, _, path = parsed.path.lstrip("/").partition("/")
+        if service not in SERVICES:
+            return self._send(404, {"error": "unknown service"})
+        query = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+        fault = self.servers._fault(service, query.get("apikey"))
+        if fault is not None:
+            return self._send(*fault)
+        handler = getattr(self, f"_{service}")
+        self._send(*handler("/" + path, query))
+
+    def _send(self, status, body, headers=None):
+        if isinstance(body, (dict, list)):
+            body = json.dumps(body)
+            content_type = "application/json; charset=utf-8"
+        else:
+            content_type = "text/html; charset=utf-8"
+        data = body.encode("utf-8") if body is not None else b""
+        try:
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+        except (BrokenPipeError, ConnectionResetError):
+            # The client gave up first (e.g. timed out on injected latency)
+            self.close_connection = True
+            return
+        self.servers._count(self.path.lstrip("/").split("/")[0], status)
+
+    # ── OMDb ────────────────────────────────────────────────────────────────
+    def _omdb(self, path, query):
+        title = self.servers.title(query.get("i", ""))
+        if title is None:
+            return 200, {"Response": "False", "Error": "Incorrect IMDb ID."}
+        return 200, {"Response": "True", "Type": title["Type"], "Title": title["Title"],
+                     "Runtime": title["Runtime"], "imdbRating": title["imdbRating"]}
+
+    # ── TVMaze ──────────────────────────────────────────────────────────────
+    def _tvmaze(self, path, query):
+        if path == "/lookup/shows":
+            title = self.servers.title(query.get("imdb", ""))
+            if not title or not title.get("tvmaze_id"):
+                return 404, {"name": "Not Found", "status": 404}
+            return 200, self._show(title)
+        m = re.fullmatch(r"/shows/(\d+)", path)
+        if m:
+            title = self.servers.show(int(m.group(1)))
+            if title is None:
+                return 404, {"name": "Not Found", "status": 404}
+            show = self._show(title)
+            if query.get("embed") == "seasons":
+                show["_embedded"] = {"seasons": [
+                    {"id": title["tvmaze_id"] * 100 + n, "number": n, "episodeOrder": order}
+                    for n, order in enumerate(title["seasons"], 1)
+                ]}
+            etag = f'W/"{title["tvmaze_id"]}-{len(title["seasons"])}-{title.get("aired", 0)}"'
+            if self.headers.get("If-None-Match") == etag:
+                return 304, None, {"ETag": etag}
+            return 200, show, {"ETag": etag}
+        m = re.fullmatch(r"/seasons/(\d+)/episodes", path)
+        if m:
+            title = self.servers.show(int(m.group(1)) // 100)
+            if title is None:
+                return 404, {"name": "Not Found", "status": 404}
+            episodes = [{"number": n} for n in range(1, title.get("aired", 0) + 1)]
+            return 200, episodes + [{"number": None, "type": "significant_special"}]
+        return 404, {"name": "Not Found", "status": 404}
+
+    @staticmethod
+    def _show(title):
+        return {"id": title["tvmaze_id"], "name": title["Title"], "status": title.get("status")}
+
+    # ── IMDb ────────────────────────────────────────────────────────────────
+    def _imdb(self, path, query):
+        m = re.fullmatch(r"/title/(tt\d+)/?", path)
+        title = self.servers.title(m.group(1)) if m else None
+        if title is None:
+            return 404, "<html><body>Not found</body></html>"
+        episodes = title.get("episodes")
+        if episodes is None and title["Type"] == "series":
+            episodes = sum(order or title.get("aired", 0) for order in title["seasons"])
+        schema = {"@type": "TVSeries" if title["Type"] == "series" else "Movie", "name": title["Title"]}
+        if episodes is not None:
+            schema["numberOfEpisodes"] = episodes
+        # Real pages are a few hundred KB with the schema.org block near the top
+        return 200, ("<html><head><script type=\"application/ld+json\">"
+                     f"{json.dumps(schema)}</script></head><body>"
+                     + "<div>" + "x" * 200 * 1024 + "</div></body></html>")
+
+
+class FakeServers:
+    """The stand-in server, running on a background thread.
+
+    Fault settings apply per service and can be changed while it runs (see
+    configure):
+      latency     — seconds added to every response
+      jitter      — up to this many extra seconds, at random
+      error_rate  — share of requests answered with HTTP 500
+      rate_limit  — requests per second allowed before TVMaze answers 429
+                    and OMDb "Request limit reached!"
+    OMDb only:
+      quota       — requests each API key may make in total
+      bad_keys    — keys answered with "Invalid API key!"
+    """
+
+    def __init__(self, port=0, host="127.0.0.1", fixtures=None, synthetic=True, seed=0,
+                 **faults):
+        self.fixtures = dict(FIXTURES if fixtures is None else fixtures)
+        self.synthetic = synthetic
+        self.stats = Counter()  # (service, status) → responses
+        self._faults = {service: {} for service in SERVICES}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._windows = {}      # service → (second, requests in it)
+        self._key_use = Counter()
+        self._shows = {}
+        self.configure(**faults)
+
+        handler = type("Handler", (_Handler,), {"servers": self})
+        self._server = ThreadingHTTPServer((host, port), handler)
+        self._server.daemon_threads = True
+        self._thread = None
+
+    # ── lifecycle ───────────────────────────────────────────────────────────
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True,
+                                        name="fake-servers")
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    @property
+    def urls(self):
+        host, port = self._server.server_address[:2]
+        return {service: f"http://{host}:{port}/{service}" for service in SERVICES}
+
+    def install(self):
+        """Point imdb_fetcher at these servers."""
+        import imdb_fetcher
+
+        imdb_fetcher.set_base_urls(**self.urls)
+
+    def configure(self, service=None, **faults):
+        """Set fault options for one service, or for all of them."""
+        with self._lock:
+            for name in (service,) if service else SERVICES:
+                self._faults[name].update(faults)
+
+    # ── lookups used by the handler ─────────────────────────────────────────
+    def title(self, imdb_id):
+        title = self.fixtures.get(imdb_id)
+        if title is None and self.synthetic and re.fullmatch(r"tt\d+", imdb_id):
+            title = _synthetic(imdb_id)
+        if title and title.get("tvmaze_id"):
+            with self._lock:
+                self._shows[title["tvmaze_id"]] = title
+        return title
+
+    def show(self, tvmaze_id):
+        with self._lock:
+            title = self._shows.get(tvmaze_id)
+        if title is None:
+            title = next((t for t in self.fixtures.values() if t.get("tvmaze_id") == tvmaze_id), None)
+        return title
+
+    def _fault(self, service, api_key):
+        """Apply latency and decide whether this request fails.  Returns
+        (status, body) for an injected failure, else None."""
+        with self._lock:
+            faults = dict(self._faults[service])
+            delay = faults.get("latency", 0) + self._rng.uniform(0, faults.get("jitter", 0))
+            failed = self._rng.random() < faults.get("error_rate", 0)
+            limited = False
+            if faults.get("rate_limit"):
+                second = int(time.monotonic())
+                window, used = self._windows.get(service, (second, 0))
+                used = used + 1 if window == second else 1
+                self._windows[service] = (second, used)
+                limited = used > faults["rate_limit"]
+            if service == "omdb" and api_key is not None:
+                self._key_use[api_key] += 1
+                limited = limited or self._key_use[api_key] > faults.get("quota", float("inf"))
+        if delay:
+            time.sleep(delay)
+        if service == "omdb" and api_key in faults.get("bad_keys", ()):
+            return 401, {"Response": "False", "Error": "Invalid API key!"}
+        if limited:
+            if service == "omdb":
+                return 401, {"Response": "False", "Error": "Request limit reached!"}
+            return 429, {"name": "Too Many Requests", "status": 429}
+        if failed:
+            return 500, {"error": "injected failure"}
+        return None
+
+    def _count(self, service, status):
+        with self._lock:
+            self.stats[(service, status)] += 1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve local stand-ins for OMDb, TVMaze and IMDb.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to each response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="random extra latency, up to seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests failing with 500")
+    parser.add_argument("--rate-limit", type=int, help="requests per second per service")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    servers = FakeServers(args.port, args.host, seed=args.seed, latency=args.latency,
+                          jitter=args.jitter, error_rate=args.error_rate, rate_limit=args.rate_limit)
+    urls = servers.urls
+    print("Serving; point the app here with:")
+    print(f"  WATCHLIST_OMDB_URL={urls['omdb']}")
+    print(f"  WATCHLIST_TVMAZE_URL={urls['tvmaze']}")
+    print(f"  WATCHLIST_IMDB_URL={urls['imdb']}")
+    try:
+        servers._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servers._server.server_close()
+
+
+if __name__ == "__main__":
+    main()
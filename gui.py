@@ -2,27 +2,46 @@ import sys
 import os
 from PySide6.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QHBoxLayout, QLineEdit,
-    QPushButton, QTableWidget, QTableWidgetItem, QMessageBox, QDialog,
+    QPushButton, QTableView, QMessageBox, QDialog,
     QFileDialog, QDateEdit, QStyledItemDelegate, QComboBox, QLabel,
     QProgressBar, QCalendarWidget, QStyleOptionViewItem
 )
-from PySide6.QtCore import Qt, QDate, QTimer, QThread, Signal, QSettings
+from PySide6.QtCore import (
+    Qt, QDate, QTimer, QThread, Signal, QSettings, QAbstractTableModel, QModelIndex
+)
 from PySide6 import QtGui
 from PySide6.QtGui import QIcon
 from PySide6.QtWidgets import QStyle
 import webbrowser
 import re
-from imdb_fetcher import fetch_movie_info
+import time
+import datetime
 from movie_manager import MovieManager
-from models import Movie
-from database import init_db, save_movies, load_movies, export_to_json, import_from_json
+from models import Movie, imdb_id
+from database import (init_db, save_movies, load_movies, search_titles, title_matches,
+                      apply_journal, stale_urls, mark_fetched, export_to_json, import_from_json)
 from version import __version__
-from updater import (get_latest_release, is_newer, download_update,
-                     apply_update, do_staged_update, cleanup_old_version)
-from cloud_sync import is_configured, download_db, upload_db
+import startup_trace
+from startup_trace import phase
+from cloud_sync import is_configured, is_signed_in
+
+# imdb_fetcher, updater and the rest of cloud_sync are imported where they
+# are first used: they pull in requests and the Google client libraries,
+# which would otherwise slow down every start.
+
+# How long closing the window waits for the startup sync before leaving it
+# to finish on its own (each Drive request times out after
+# cloud_sync.HTTP_TIMEOUT anyway)
+SYNC_CLOSE_WAIT_MS = 3000
 
 DATE_FORMAT = "dd/MM/yyyy"
 _NULL_DATE = QDate(2000, 1, 1)  # sentinel for "no date selected"
+# Background metadata refresh: every REFRESH_INTERVAL_MS, if the app is idle,
+# up to REFRESH_BATCH movies not refreshed for REFRESH_AGE seconds are looked
+# up again (mostly answered by imdb_fetcher's cache).
+REFRESH_INTERVAL_MS = 60 * 1000
+REFRESH_AGE = 24 * 3600
+REFRESH_BATCH = 5
 _HAS_FOCUS_MASK = 0x100  # QStyle.StateFlag.HasFocus — stable Qt constant, avoids strict-enum int() issues
 
 APP_STYLE = """
@@ -65,25 +84,25 @@ QComboBox QAbstractItemView {
 }
 
 /* ── Table ─────────────────────────────────── */
-QTableWidget {
+QTableView {
     background: #FFFFFF;
     alternate-background-color: #F8FAFC;
     border: 1px solid #E2E8F0;
     border-radius: 10px;
     gridline-color: #E2E8F0;
 }
-QTableWidget { outline: none; }
-QTableWidget::item { padding: 5px 8px; }
-QTableWidget::item:selected {
+QTableView { outline: none; }
+QTableView::item { padding: 5px 8px; }
+QTableView::item:selected {
     background: #EFF6FF;
     color: #1D4ED8;
 }
 /* Suppress native OS blue on hover and focus — no explicit rule → fallback to native */
-QTableWidget::item:focus       { background: transparent; border: none; }
-QTableWidget::item:hover       { background: transparent; }
+QTableView::item:focus       { background: transparent; border: none; }
+QTableView::item:hover       { background: transparent; }
 /* More-specific combined states keep selected appearance */
-QTableWidget::item:selected:focus { background: #EFF6FF; color: #1D4ED8; }
-QTableWidget::item:selected:hover { background: #EFF6FF; color: #1D4ED8; }
+QTableView::item:selected:focus { background: #EFF6FF; color: #1D4ED8; }
+QTableView::item:selected:hover { background: #EFF6FF; color: #1D4ED8; }
 
 /* ── Column headers ────────────────────────── */
 QHeaderView::section {
@@ -234,20 +253,261 @@ def get_resource_path(relative_path):
     return os.path.join(os.path.dirname(os.path.abspath(__file__)), relative_path)
 
 
-class SortableItem(QTableWidgetItem):
-    """QTableWidgetItem that compares by Qt.UserRole (numeric) when available."""
-    def __lt__(self, other):
-        my_key = self.data(Qt.UserRole)
-        other_key = other.data(Qt.UserRole) if isinstance(other, QTableWidgetItem) else None
-        if my_key is not None and other_key is not None:
-            try:
-                return my_key < other_key
-            except TypeError:
-                pass
-        # Never call super().__lt__() — PySide6 routes it back into this
-        # Python override, causing infinite recursion. Use text directly.
-        other_text = other.text() if isinstance(other, QTableWidgetItem) else str(other)
-        return self.text() < other_text
+class MovieTableModel(QAbstractTableModel):
+    """Table model over MovieManager.movies.
+
+    The manager's list is the only row store: cells are produced on demand in
+    data(), so only the rows currently on screen are ever materialized.  Row
+    order in the view is always the order of manager.movies — sorting and
+    moving reorder that list — so a view row index is also a manager index.
+    """
+    HEADERS = ["Title", "Length", "Episodes", "IMDb", "Date", "Days Left", "Platform", "Link"]
+    # The user changed the list (add/remove/edit/move) — unlike sorting,
+    # midnight rollover or a background metadata refresh
+    edited = Signal()
+
+    def __init__(self, manager, parent=None):
+        super().__init__(parent)
+        self.manager = manager
+        self._urgency_brushes = [
+            (max_days, QtGui.QBrush(QtGui.QColor(bg_hex)), QtGui.QBrush(QtGui.QColor(fg_hex)))
+            for max_days, bg_hex, fg_hex in _URGENCY
+        ]
+        self._link_brush = QtGui.QBrush(QtGui.QColor("blue"))
+        self._today = datetime.date.today().toordinal()
+
+    # --- day-dependent values, from the movie's pre-parsed watch date ---
+    def _days_left(self, movie):
+        if movie.watch_ordinal is None:
+            return None
+        return movie.watch_ordinal - self._today
+
+    def set_today(self, today):
+        """Move "today" to another day ordinal (midnight rollover).
+
+        Days Left is derived from self._today on demand, so this is a single
+        offset change plus one dataChanged for that column: the view re-reads
+        only the cells on screen, and their text and urgency colors follow.
+        Sorting by Days Left is unaffected since every row shifts equally.
+        """
+        if today == self._today:
+            return
+        self._today = today
+        if self.manager.movies:
+            self.dataChanged.emit(self.index(0, COL_DAYS_LEFT),
+                                  self.index(len(self.manager.movies) - 1, COL_DAYS_LEFT))
+
+    def _days_left_text(self, movie):
+        days = self._days_left(movie)
+        if days is None:
+            return ""
+        if days == 0:
+            return "Last Day"
+        if days > 0:
+            return str(days)
+        return f"{abs(days)}d ago"
+
+    # --- urgency color for Days Left cell ---
+    def _urgency_color(self, days):
+        """Return (QBrush bg, QBrush fg) for a days-left count, or (None, None)."""
+        if days is None:
+            return None, None
+        for max_days, bg, fg in self._urgency_brushes:
+            if days <= max_days:
+                return bg, fg
+        return None, None
+
+    def _text(self, movie, col):
+        if col == COL_TITLE:
+            return movie.title
+        if col == COL_LENGTH:
+            return movie.length
+        if col == COL_EPISODES:
+            return movie.episodes
+        if col == COL_RATING:
+            return movie.imdb_rating
+        if col == COL_DATE:
+            return movie.watch_date
+        if col == COL_DAYS_LEFT:
+            return self._days_left_text(movie)
+        if col == COL_PLATFORM:
+            return movie.platform
+        if col == COL_LINK:
+            return movie.url
+        return None
+
+    def _sort_key(self, movie, col):
+        """Numeric key for columns that have one, else None (sort by text).
+
+        Rows without a value (no date, "-" rating, …) sort last.
+        """
+        if col == COL_LENGTH:
+            key = movie.runtime_minutes
+        elif col == COL_EPISODES:
+            key = movie.episode_count
+        elif col == COL_RATING:
+            key = movie.rating
+        elif col == COL_DATE:
+            key = movie.watch_ordinal
+        elif col == COL_DAYS_LEFT:
+            key = self._days_left(movie)
+        else:
+            return None
+        return float('inf') if key is None else key
+
+    # --- QAbstractTableModel interface ---
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.manager.movies)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal:
+            if role == Qt.DisplayRole:
+                return self.HEADERS[section]
+            if role == Qt.TextAlignmentRole:
+                return Qt.AlignCenter
+        return super().headerData(section, orientation, role)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        movie = self.manager.movies[index.row()]
+        col = index.column()
+        if role in (Qt.DisplayRole, Qt.EditRole):
+            return self._text(movie, col)
+        if role == Qt.TextAlignmentRole:
+            return Qt.AlignCenter
+        if role == Qt.UserRole:
+            return self._sort_key(movie, col)
+        if col == COL_DAYS_LEFT and role in (Qt.BackgroundRole, Qt.ForegroundRole):
+            bg, fg = self._urgency_color(self._days_left(movie))
+            return bg if role == Qt.BackgroundRole else fg
+        if col == COL_LINK and role == Qt.ForegroundRole:
+            return self._link_brush
+        return None
+
+    def flags(self, index):
+        flags = super().flags(index)
+        if index.isValid() and index.column() == COL_DATE:
+            flags |= Qt.ItemIsEditable
+        return flags
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if not index.isValid() or index.column() != COL_DATE or role != Qt.EditRole:
+            return False
+        movie = self.manager.movies[index.row()]
+        movie.watch_date = value
+        movie.touch("watch_date")
+        self.dataChanged.emit(index, index.siblingAtColumn(COL_DAYS_LEFT))
+        self.edited.emit()
+        return True
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        if column < 0:
+            return  # no active sort (rows were reordered by hand)
+        movies = self.manager.movies
+        self.layoutAboutToBeChanged.emit()
+        old_persistent = self.persistentIndexList()
+        tracked = [movies[index.row()] for index in old_persistent]
+
+        def key(movie):
+            sort_key = self._sort_key(movie, column)
+            return (0, sort_key, "") if sort_key is not None else (1, 0, self._text(movie, column))
+
+        movies.sort(key=key, reverse=(order == Qt.DescendingOrder))
+        new_rows = {id(movie): row for row, movie in enumerate(movies)}
+        self.changePersistentIndexList(
+            old_persistent,
+            [self.index(new_rows[id(movie)], index.column())
+             for movie, index in zip(tracked, old_persistent)]
+        )
+        self.layoutChanged.emit()
+
+    # --- edits, all routed through the manager so model and list agree ---
+    def add_movie(self, movie):
+        row = len(self.manager.movies)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.manager.add_movie(movie)
+        self.endInsertRows()
+        self.edited.emit()
+
+    def add_movies(self, movies):
+        """Append many movies as one insert, so the view lays out only once."""
+        if not movies:
+            return
+        first = len(self.manager.movies)
+        self.beginInsertRows(QModelIndex(), first, first + len(movies) - 1)
+        self.manager.movies.extend(movies)
+        self.endInsertRows()
+        self.edited.emit()
+
+    def remove_movie(self, row):
+        if 0 <= row < len(self.manager.movies):
+            self.beginRemoveRows(QModelIndex(), row, row)
+            self.manager.remove_movie(row)
+            self.endRemoveRows()
+            self.edited.emit()
+
+    def edit_movie(self, row, movie):
+        if 0 <= row < len(self.manager.movies):
+            old = self.manager.movies[row]
+            movie.position = old.position
+            movie.edited_at = dict(old.edited_at)
+            movie.touch(*(field for field in Movie.FIELDS
+                          if getattr(movie, field) != getattr(old, field)))
+            self.manager.edit_movie(row, movie)
+            self._rows_changed(row, row)
+            self.edited.emit()
+
+    def update_info(self, row, title, length, episodes, imdb_rating):
+        """Overwrite a row's fetched fields in place.  Returns True if any changed."""
+        movie = self.manager.movies[row]
+        new = (title, length, episodes, imdb_rating)
+        if (movie.title, movie.length, movie.episodes, movie.imdb_rating) == new:
+            return False
+        movie.touch(*(field for field, old, value in
+                      zip(("title", "length", "episodes", "imdb_rating"),
+                          (movie.title, movie.length, movie.episodes, movie.imdb_rating), new)
+                      if old != value))
+        movie.title, movie.length, movie.episodes, movie.imdb_rating = new
+        self._rows_changed(row, row)
+        return True
+
+    def move_up(self, row):
+        if row > 0:
+            self.manager.move_up(row)
+            self._rows_changed(row - 1, row)
+            self.edited.emit()
+
+    def move_down(self, row):
+        if row < len(self.manager.movies) - 1:
+            self.manager.move_down(row)
+            self._rows_changed(row, row + 1)
+            self.edited.emit()
+
+    def row_of(self, movie):
+        """Current row of a movie object, or -1 if it is no longer listed."""
+        for row, listed in enumerate(self.manager.movies):
+            if listed is movie:
+                return row
+        return -1
+
+    def row_of_title(self, movie):
+        """Like row_of, but also finds the movie object that replaced movie
+        when the list was reloaded (a remote merge): same key, or same URL
+        for a movie never saved.  -1 if the title is no longer listed."""
+        row = self.row_of(movie)
+        if row >= 0:
+            return row
+        for row, listed in enumerate(self.manager.movies):
+            if (listed.key == movie.key) if movie.key is not None else (listed.url == movie.url):
+                return row
+        return -1
+
+    def _rows_changed(self, first, last):
+        self.dataChanged.emit(self.index(first, 0), self.index(last, len(self.HEADERS) - 1))
 
 
 class NoFocusDelegate(QStyledItemDelegate):
@@ -282,12 +542,32 @@ class DateDelegate(NoFocusDelegate):
 
 
 class UpdateCheckWorker(QThread):
-    update_available = Signal(str, str)  # (latest_tag, download_url)
+    # (latest_tag, download_url, sha256 or None, delta_url or None)
+    update_available = Signal(str, str, object, object)
 
     def run(self):
-        tag, url = get_latest_release()
+        from updater import RELEASE_CHECK_INTERVAL, get_latest_release, is_newer
+
+        # The last response is kept in QSettings so most launches make no
+        # request at all, and the rest a conditional one
+        s = QSettings("MovieWatchlist", "MovieWatchlist")
+        cache = {
+            "body": s.value("update_check/body", ""),
+            "etag": s.value("update_check/etag", ""),
+            "checked_at": float(s.value("update_check/checked_at", 0)),
+            "sha256": s.value("update_check/sha256", ""),
+            "sha256_url": s.value("update_check/sha256_url", ""),
+        }
+        interval = float(s.value("update_check/interval", RELEASE_CHECK_INTERVAL))
+        tag, url, sha256, delta_url = get_latest_release(cache, max_age=interval)
+        s.setValue("update_check/body", cache.get("body") or "")
+        s.setValue("update_check/etag", cache.get("etag") or "")
+        s.setValue("update_check/checked_at", cache.get("checked_at", 0))
+        s.setValue("update_check/sha256", cache.get("sha256") or "")
+        s.setValue("update_check/sha256_url", cache.get("sha256_url") or "")
+        s.setValue("update_check/interval", interval)
         if tag and url and is_newer(__version__, tag):
-            self.update_available.emit(tag, url)
+            self.update_available.emit(tag, url, sha256, delta_url)
 
 
 class DownloadWorker(QThread):
@@ -295,25 +575,103 @@ class DownloadWorker(QThread):
     finished = Signal(str)   # path to downloaded file
     error = Signal(str)
 
-    def __init__(self, url):
+    def __init__(self, url, sha256=None, delta_url=None):
         super().__init__()
         self.url = url
+        self.sha256 = sha256
+        self.delta_url = delta_url
 
     def run(self):
+        from updater import download_update
+
         try:
-            path = download_update(self.url, self.progress.emit)
+            path = download_update(self.url, self.progress.emit, sha256=self.sha256,
+                                   delta_url=self.delta_url)
             self.finished.emit(path)
         except Exception as e:
             self.error.emit(str(e))
 
 
+class SyncDownloadWorker(QThread):
+    """Pulls changes from Google Drive while the window opens.
+
+    Normally that is just the other devices' journal files.  A device with no
+    local database yet (bootstrap=True) first downloads the full file, which
+    is written next to the live one.  Applying either is left to the GUI
+    thread (MovieWatchlistApp.apply_downloaded_db / apply_remote_journal).
+    """
+    downloaded = Signal(str)                  # path of the downloaded copy
+    journal_received = Signal(object, object)  # (entries, Drive files merged from)
+
+    def __init__(self, local_path, bootstrap=False):
+        super().__init__()
+        self.local_path = local_path
+        self.bootstrap = bootstrap
+
+    def run(self):
+        incoming = self.local_path + ".incoming"
+        try:
+            from cloud_sync import download_db, fetch_remote_journal, prune_pushed_journal
+
+            with phase("download_db", bootstrap=self.bootstrap):
+                if self.bootstrap and download_db(self.local_path, incoming):
+                    self.downloaded.emit(incoming)
+            with phase("fetch_remote_journal"):
+                entries, files = fetch_remote_journal()
+            if files:
+                self.journal_received.emit(entries, files)
+            prune_pushed_journal()
+        except Exception as e:
+            print(f"Cloud sync download skipped: {e}")
+
+
+class FetchWorker(QThread):
+    """Runs fetch_movie_info for one movie off the GUI thread."""
+    fetched = Signal(object, object)  # (movie the fetch was for, fetch_movie_info tuple)
+
+    def __init__(self, movie, url):
+        super().__init__()
+        self.movie = movie
+        self.url = url
+
+    def run(self):
+        from imdb_fetcher import fetch_movie_info
+
+        self.fetched.emit(self.movie, fetch_movie_info(self.url))
+
+
+class RefreshWorker(QThread):
+    """Re-fetches metadata for a small batch of movies (fetch_many)."""
+    refreshed = Signal(object, object)  # (movie, fetch_movie_info tuple)
+
+    def __init__(self, movies):
+        super().__init__()
+        self.movies = movies
+
+    def run(self):
+        from imdb_fetcher import fetch_many
+
+        by_url = {movie.url: movie for movie in self.movies}
+        try:
+            # Two at a time: this runs behind the user's back, so keep it gentle
+            for url, info, error in fetch_many(list(by_url), max_workers=2):
+                if self.isInterruptionRequested():
+                    break  # closing: lookups not started yet are dropped
+                if info:
+                    self.refreshed.emit(by_url[url], info)
+        except Exception as e:
+            print(f"Metadata refresh skipped: {e}")
+
+
 class UpdateDialog(QDialog):
-    def __init__(self, latest_tag, download_url, parent=None):
+    def __init__(self, latest_tag, download_url, sha256=None, delta_url=None, parent=None):
         super().__init__(parent)
         self.setWindowTitle("Update Available")
         self.setFixedWidth(420)
         self.setWindowFlag(Qt.WindowContextHelpButtonHint, False)
         self._download_url = download_url
+        self._sha256 = sha256
+        self._delta_url = delta_url
         self._worker = None
 
         layout = QVBoxLayout()
@@ -357,13 +715,15 @@ class UpdateDialog(QDialog):
         self._status.setText("Downloading…")
         self._status.show()
 
-        self._worker = DownloadWorker(self._download_url)
+        self._worker = DownloadWorker(self._download_url, self._sha256, self._delta_url)
         self._worker.progress.connect(self._progress.setValue)
         self._worker.finished.connect(self._on_finished)
         self._worker.error.connect(self._on_error)
         self._worker.start()
 
     def _on_finished(self, new_exe_path):
+        from updater import apply_update
+
         self._status.setText("Installing update…")
         apply_update(new_exe_path)
         QApplication.quit()
@@ -381,42 +741,33 @@ class MovieWatchlistApp(QWidget):
         icon_path = get_resource_path(os.path.join("assets", "movie-icon-15159.png"))
         self.setWindowIcon(QIcon(icon_path))
         self.manager = MovieManager()
+        self.model = MovieTableModel(self.manager, self)
+        self._fetch_workers = set()
+        self._placeholders = set()  # rows added but still waiting for metadata
+        self.sync_worker = None  # startup SyncDownloadWorker, set by run_app
         self._sort_col = COL_DAYS_LEFT
         self._sort_order = Qt.AscendingOrder
-        self.init_ui()
-        self._restore_settings()
-        self.table.cellClicked.connect(self.open_link)
-        self.table.itemChanged.connect(self.on_item_changed)
-
-    def _make_item(self, text, editable=False):
-        item = SortableItem(text)
-        item.setTextAlignment(Qt.AlignCenter)
-        if not editable:
-            item.setFlags(item.flags() & ~Qt.ItemIsEditable)
-        return item
-
-    # --- urgency color for Days Left cell ---
-    def _urgency_color(self, sort_key):
-        """Return (QBrush bg, QBrush fg) for a days-left sort key, or (None, None)."""
-        if sort_key == float('inf'):
-            return None, None
-        for max_days, bg_hex, fg_hex in _URGENCY:
-            if sort_key <= max_days:
-                return QtGui.QBrush(QtGui.QColor(bg_hex)), QtGui.QBrush(QtGui.QColor(fg_hex))
-        return None, None
-
-    # --- sort key helpers ---
-    def _length_sort_key(self, length_str):
-        m = re.search(r'\((\d+)\s*min\)', length_str)
-        return int(m.group(1)) if m else float('inf')
-
-    def _date_sort_key(self, date_str):
-        date = QDate.fromString(date_str, DATE_FORMAT)
-        return date.toJulianDay() if date.isValid() else float('inf')
-
-    def _days_left_sort_key(self, date_str):
-        date = QDate.fromString(date_str, DATE_FORMAT)
-        return QDate.currentDate().daysTo(date) if date.isValid() else float('inf')
+        with phase("init_ui"):
+            self.init_ui()
+        with phase("_restore_settings"):
+            self._restore_settings()
+        self.table.clicked.connect(self.open_link)
+        self._db_dirty = False  # in-memory list differs from watchlist.db
+        self._user_edited = False  # the user changed the list since it was loaded
+        self._sync_abandoned = False  # closed before the startup sync finished
+        self._refresh_abandoned = False  # closed during a background refresh
+        self._rollover_timer = QTimer(self)
+        self._rollover_timer.setSingleShot(True)
+        self._rollover_timer.timeout.connect(self._on_midnight)
+        self._schedule_rollover()
+        self._refresh_worker = None
+        self._refresh_timer = QTimer(self)
+        self._refresh_timer.timeout.connect(self._refresh_stale)
+        self._refresh_timer.start(REFRESH_INTERVAL_MS)
+        for signal in (self.model.dataChanged, self.model.rowsInserted,
+                       self.model.rowsRemoved, self.model.layoutChanged):
+            signal.connect(self._on_model_changed)
+        self.model.edited.connect(self._on_user_edit)
 
     def _on_header_clicked(self, col):
         if col == self._sort_col:
@@ -425,7 +776,7 @@ class MovieWatchlistApp(QWidget):
         else:
             self._sort_col = col
             self._sort_order = Qt.AscendingOrder
-        self.table.sortItems(self._sort_col, self._sort_order)
+        self.model.sort(self._sort_col, self._sort_order)
         self.table.horizontalHeader().setSortIndicator(self._sort_col, self._sort_order)
 
     def _restore_settings(self):
@@ -438,11 +789,11 @@ class MovieWatchlistApp(QWidget):
         self._sort_col = int(s.value("sort_col", COL_DAYS_LEFT))
         order_val = int(s.value("sort_order", 0))
         self._sort_order = Qt.DescendingOrder if order_val == 1 else Qt.AscendingOrder
-        for col in range(self.table.columnCount()):
+        for col in range(self.model.columnCount()):
             w = s.value(f"col_width_{col}")
             if w is not None:
                 self.table.setColumnWidth(col, int(w))
-        self.table.sortItems(self._sort_col, self._sort_order)
+        self.model.sort(self._sort_col, self._sort_order)
         self.table.horizontalHeader().setSortIndicator(self._sort_col, self._sort_order)
 
     def _save_settings(self):
@@ -450,7 +801,7 @@ class MovieWatchlistApp(QWidget):
         s.setValue("window_geometry", self.saveGeometry())
         s.setValue("sort_col", self._sort_col)
         s.setValue("sort_order", 1 if self._sort_order == Qt.DescendingOrder else 0)
-        for col in range(self.table.columnCount()):
+        for col in range(self.model.columnCount()):
             s.setValue(f"col_width_{col}", self.table.columnWidth(col))
 
     def init_ui(self):
@@ -492,17 +843,26 @@ class MovieWatchlistApp(QWidget):
         input_layout.addWidget(self.clear_btn)
         layout.addLayout(input_layout)
 
-        self.table = QTableWidget(0, 8)
-        self.table.setHorizontalHeaderLabels(["Title", "Length", "Episodes", "IMDb", "Date", "Days Left", "Platform", "Link"])
-        for col in range(self.table.columnCount()):
-            self.table.horizontalHeaderItem(col).setTextAlignment(Qt.AlignCenter)
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("Search titles…")
+        self.search_input.setClearButtonEnabled(True)
+        # Debounced: the query runs once typing pauses, not on every keystroke
+        self._search_timer = QTimer(self)
+        self._search_timer.setSingleShot(True)
+        self._search_timer.setInterval(200)
+        self._search_timer.timeout.connect(self._apply_search)
+        self.search_input.textChanged.connect(self._search_timer.start)
+        layout.addWidget(self.search_input)
+
+        self.table = QTableView()
+        self.table.setModel(self.model)
         self.table.setItemDelegate(NoFocusDelegate(self))
         self.table.setItemDelegateForColumn(COL_DATE, DateDelegate(self))
         self.table.setSortingEnabled(False)
         self.table.horizontalHeader().sectionClicked.connect(self._on_header_clicked)
         self.table.setAlternatingRowColors(True)
-        self.table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
-        self.table.setSelectionMode(QTableWidget.SelectionMode.SingleSelection)
+        self.table.setSelectionBehavior(QTableView.SelectionBehavior.SelectRows)
+        self.table.setSelectionMode(QTableView.SelectionMode.SingleSelection)
         self.table.verticalHeader().setDefaultSectionSize(38)
         self.table.horizontalHeader().setStretchLastSection(True)
         self.table.setColumnWidth(COL_TITLE, 220)
@@ -541,75 +901,134 @@ class MovieWatchlistApp(QWidget):
         layout.addLayout(button_layout)
         self.setLayout(layout)
 
-        for url, title, length, date, platform, episodes, imdb_rating in load_movies():
-            self.manager.add_movie(Movie(url, title, length, date, platform, episodes, imdb_rating))
-            self._insert_row(url, title, length, date, platform, episodes, imdb_rating)
-        # Default sort — overridden by _restore_settings if saved prefs exist
-        self.table.sortItems(COL_DAYS_LEFT, Qt.AscendingOrder)
-        self.table.horizontalHeader().setSortIndicator(COL_DAYS_LEFT, Qt.AscendingOrder)
-
-    def _days_left_text(self, date_str):
-        date = QDate.fromString(date_str, DATE_FORMAT)
-        if not date.isValid():
-            return ""
-        days = QDate.currentDate().daysTo(date)
-        if days == 0:
-            return "Last Day"
-        if days > 0:
-            return str(days)
-        return f"{abs(days)}d ago"
-
-    def _insert_row(self, url, title, length, date, platform="", episodes="-", imdb_rating="-"):
-        self.table.blockSignals(True)
-        row = self.table.rowCount()
-        self.table.insertRow(row)
-
-        self.table.setItem(row, COL_TITLE, self._make_item(title))
-
-        length_item = self._make_item(length)
-        length_item.setData(Qt.UserRole, self._length_sort_key(length))
-        self.table.setItem(row, COL_LENGTH, length_item)
-
-        self.table.setItem(row, COL_EPISODES, self._make_item(episodes))
-        self.table.setItem(row, COL_RATING, self._make_item(imdb_rating))
-
-        date_item = self._make_item(date, editable=True)
-        date_item.setData(Qt.UserRole, self._date_sort_key(date))
-        self.table.setItem(row, COL_DATE, date_item)
-
-        days_key = self._days_left_sort_key(date)
-        days_item = self._make_item(self._days_left_text(date))
-        days_item.setData(Qt.UserRole, days_key)
-        bg, fg = self._urgency_color(days_key)
-        if bg:
-            days_item.setBackground(bg)
-        if fg:
-            days_item.setForeground(fg)
-        self.table.setItem(row, COL_DAYS_LEFT, days_item)
-
-        self.table.setItem(row, COL_PLATFORM, self._make_item(platform))
-
-        link_item = self._make_item(url)
-        link_item.setForeground(QtGui.QColor("blue"))
-        self.table.setItem(row, COL_LINK, link_item)
-
-        self.table.blockSignals(False)
+        # Populated in one pass; _restore_settings applies the (saved or
+        # default) sort exactly once afterwards.
+        with phase("load_movies"):
+            movies = [Movie(*row) for row in load_movies()]
+        with phase("populate table", rows=len(movies)):
+            self.model.add_movies(movies)
+
+    def _schedule_rollover(self):
+        """Arm the timer for just after the next local midnight."""
+        now = datetime.datetime.now()
+        midnight = datetime.datetime.combine(now.date() + datetime.timedelta(days=1), datetime.time())
+        msecs = int((midnight - now).total_seconds() * 1000) + 1000
+        self._rollover_timer.start(msecs)
+
+    def _on_midnight(self):
+        self.model.set_today(datetime.date.today().toordinal())
+        self._schedule_rollover()
+
+    def _is_idle(self):
+        """True when nothing else is fetching or syncing and no dialog or
+        cell editor is open."""
+        if self._fetch_workers or QApplication.activeModalWidget() is not None:
+            return False
+        if self.table.state() == QTableView.EditingState:
+            return False
+        return not any(worker is not None and worker.isRunning()
+                       for worker in (self._refresh_worker, self.sync_worker))
+
+    def _refresh_stale(self):
+        """Start refreshing the stalest few movies, if the app is idle."""
+        if not self._is_idle():
+            return
+        listed = {m.url: m for m in self.manager.movies if m not in self._placeholders}
+        urls = stale_urls(time.time() - REFRESH_AGE, REFRESH_BATCH)
+        movies = [listed[url] for url in urls if url in listed]
+        if not movies:
+            return
+        worker = RefreshWorker(movies)
+        worker.refreshed.connect(self._on_refreshed)
+        # Failures count as refreshed too, so a dead link is retried
+        # tomorrow rather than on every tick
+        worker.finished.connect(
+            lambda: self._refresh_abandoned or mark_fetched([m.url for m in movies]))
+        self._refresh_worker = worker
+        worker.start()
+
+    def _on_refreshed(self, movie, info):
+        if self._refresh_abandoned:
+            return
+        row = self.model.row_of_title(movie)
+        if row < 0:
+            return  # removed or edited meanwhile
+        title, length, episodes, imdb_rating = info
+        if title and length:
+            self.model.update_info(row, title, length, episodes, imdb_rating)
+
+    def _on_user_edit(self):
+        self._user_edited = True
+
+    def _on_model_changed(self, *args):
+        self._db_dirty = True
+        if self.search_input.text().strip():
+            self._search_timer.start()  # re-filter, e.g. to hide rows just added
+
+    def _apply_search(self):
+        """Hide rows whose title doesn't match the search box.
+
+        Saved titles are looked up in the FTS5 index; rows added or retitled
+        since the last save are matched in memory instead, so searching
+        never writes to the database.
+        """
+        query = self.search_input.text().strip()
+        if not query:
+            for row in range(self.model.rowCount()):
+                self.table.setRowHidden(row, False)
+            return
+        matches = search_titles(query)
+        for row, movie in enumerate(self.manager.movies):
+            if movie.key is None or "title" in movie.edited_at or "url" in movie.edited_at:
+                matched = title_matches(query, movie.title)
+            else:
+                matched = movie.url in matches
+            self.table.setRowHidden(row, not matched)
 
-    def on_item_changed(self, item):
-        if item.column() != COL_DATE:
+    def apply_downloaded_db(self, path):
+        """Swap in a newer watchlist.db from Drive and reload the table."""
+        if self._sync_abandoned:
+            os.remove(path)
             return
-        self.table.blockSignals(True)
-        date_str = item.text()
-        item.setData(Qt.UserRole, self._date_sort_key(date_str))
-        days_item = self.table.item(item.row(), COL_DAYS_LEFT)
-        if days_item:
-            days_key = self._days_left_sort_key(date_str)
-            days_item.setText(self._days_left_text(date_str))
-            days_item.setData(Qt.UserRole, days_key)
-            bg, fg = self._urgency_color(days_key)
-            days_item.setBackground(bg if bg else QtGui.QBrush())
-            days_item.setForeground(fg if fg else QtGui.QBrush())
-        self.table.blockSignals(False)
+        if self._user_edited and any(m not in self._placeholders for m in self.manager.movies):
+            # Movies were added before the download finished: keep them
+            # (adds still fetching survive the reload below)
+            print("Cloud sync download skipped: the watchlist was edited meanwhile")
+            os.remove(path)
+            return
+        from cloud_sync import adopt_downloaded_db
+
+        adopt_downloaded_db(path, "watchlist.db")
+        init_db()
+        self.reload_movies()
+
+    def apply_remote_journal(self, entries, files):
+        """Merge changes pushed by other devices and refresh the table."""
+        if self._sync_abandoned:
+            return  # not marked applied, so they are fetched again next start
+        from cloud_sync import mark_journal_applied
+
+        # Journal our own unsaved edits first so the merge can weigh them
+        if self._db_dirty:
+            save_movies([m for m in self.manager.movies if m not in self._placeholders])
+            self._db_dirty = False
+        if apply_journal(entries):
+            self.reload_movies()
+        mark_journal_applied(files)
+
+    def reload_movies(self):
+        self.model.beginResetModel()
+        self.manager.movies[:] = ([Movie(*row) for row in load_movies()]
+                                  + [m for m in self.manager.movies if m in self._placeholders])
+        self.model.endResetModel()
+        self.model.sort(self._sort_col, self._sort_order)
+        self._db_dirty = False
+        self._user_edited = False
+        self._apply_search()
+
+    def _current_row(self):
+        index = self.table.currentIndex()
+        return index.row() if index.isValid() else -1
 
     def add_movie(self):
         url = self.url_input.text().strip()
@@ -619,20 +1038,46 @@ class MovieWatchlistApp(QWidget):
         if not re.match(r'https?://(www\.)?imdb\.com/title/tt\d+', url):
             QMessageBox.warning(self, "Warning", "Please enter a valid IMDB URL.\nExample: https://www.imdb.com/title/tt1234567/")
             return
+        if imdb_id(url) in self._listed_ids():
+            QMessageBox.warning(self, "Warning", "That title is already in your watchlist.")
+            return
 
         date = ""
         if self.date_input.date() != _NULL_DATE:
             date = self.date_input.date().toString(DATE_FORMAT)
         platform = self.platform_input.currentText()
 
-        title, length, episodes, imdb_rating = fetch_movie_info(url)
+        # Show the row straight away; _on_added fills it in once the
+        # metadata arrives.  Several adds can be in flight at once.
+        placeholder = Movie(url, "Fetching…", "", date, platform)
+        self._placeholders.add(placeholder)
+        self.model.add_movie(placeholder)
+        self._clear_inputs()
+        self._start_fetch(placeholder, url, lambda info: self._on_added(placeholder, info))
+
+    def _listed_ids(self, exclude=None):
+        """IMDb ids of the listed movies (placeholders included), minus exclude's."""
+        return {imdb_id(movie.url) for movie in self.manager.movies if movie is not exclude} - {None}
+
+    def _start_fetch(self, movie, url, on_fetched):
+        worker = FetchWorker(movie, url)
+        worker.fetched.connect(lambda _movie, info: on_fetched(info))
+        worker.finished.connect(lambda: self._fetch_workers.discard(worker))
+        self._fetch_workers.add(worker)
+        worker.start()
+
+    def _on_added(self, placeholder, info):
+        self._placeholders.discard(placeholder)
+        row = self.model.row_of(placeholder)
+        if row < 0:
+            return  # removed while the fetch was running
+        title, length, episodes, imdb_rating = info
         if title and length:
-            movie = Movie(url, title, length, date, platform, episodes, imdb_rating)
-            self.manager.add_movie(movie)
-            self._insert_row(url, title, length, date, platform, episodes, imdb_rating)
-            self._clear_inputs()
+            self.model.edit_movie(row, Movie(placeholder.url, title, length, placeholder.watch_date,
+                                             placeholder.platform, episodes, imdb_rating))
         else:
-            QMessageBox.critical(self, "Error", "Failed to fetch movie data.")
+            self.model.remove_movie(row)
+            QMessageBox.critical(self, "Error", f"Failed to fetch movie data.\n{placeholder.url}")
 
     def _clear_inputs(self):
         self.url_input.clear()
@@ -641,126 +1086,75 @@ class MovieWatchlistApp(QWidget):
         self.url_input.setFocus()
 
     def remove_movie(self):
-        selected = self.table.currentRow()
+        selected = self._current_row()
         if selected >= 0:
-            self.manager.remove_movie(selected)
-            self.table.removeRow(selected)
+            self.model.remove_movie(selected)
 
     def edit_movie(self):
-        selected = self.table.currentRow()
+        selected = self._current_row()
         if selected < 0:
             return
-        current_url = self.table.item(selected, COL_LINK).text()
-        current_date = self.table.item(selected, COL_DATE).text()
-        current_platform = self.table.item(selected, COL_PLATFORM).text()
+        movie = self.manager.movies[selected]
 
-        dialog = EditDialog(current_url, current_date, current_platform, self)
+        dialog = EditDialog(movie.url, movie.watch_date, movie.platform, self)
         if dialog.exec():
             new_url, new_date, new_platform = dialog.get_data()
-            new_title, new_length, new_episodes, new_imdb_rating = fetch_movie_info(new_url)
-            if new_title and new_length:
-                self.table.blockSignals(True)
-                self.table.setItem(selected, COL_TITLE, self._make_item(new_title))
-
-                length_item = self._make_item(new_length)
-                length_item.setData(Qt.UserRole, self._length_sort_key(new_length))
-                self.table.setItem(selected, COL_LENGTH, length_item)
-
-                self.table.setItem(selected, COL_EPISODES, self._make_item(new_episodes))
-                self.table.setItem(selected, COL_RATING, self._make_item(new_imdb_rating))
-
-                date_item = self._make_item(new_date, editable=True)
-                date_item.setData(Qt.UserRole, self._date_sort_key(new_date))
-                self.table.setItem(selected, COL_DATE, date_item)
-
-                new_days_key = self._days_left_sort_key(new_date)
-                days_item = self._make_item(self._days_left_text(new_date))
-                days_item.setData(Qt.UserRole, new_days_key)
-                bg, fg = self._urgency_color(new_days_key)
-                if bg:
-                    days_item.setBackground(bg)
-                if fg:
-                    days_item.setForeground(fg)
-                self.table.setItem(selected, COL_DAYS_LEFT, days_item)
-
-                self.table.setItem(selected, COL_PLATFORM, self._make_item(new_platform))
-
-                link_item = self._make_item(new_url)
-                link_item.setForeground(QtGui.QColor("blue"))
-                self.table.setItem(selected, COL_LINK, link_item)
-                self.table.blockSignals(False)
-                self.manager.edit_movie(selected, Movie(new_url, new_title, new_length, new_date, new_platform, new_episodes, new_imdb_rating))
-            else:
-                QMessageBox.warning(self, "Error", "Failed to fetch movie info.")
+            if imdb_id(new_url) in self._listed_ids(exclude=movie):
+                QMessageBox.warning(self, "Warning", "That title is already in your watchlist.")
+                return
+            self._start_fetch(movie, new_url,
+                              lambda info: self._on_edited(movie, new_url, new_date, new_platform, info))
+
+    def _on_edited(self, movie, new_url, new_date, new_platform, info):
+        row = self.model.row_of_title(movie)
+        if row < 0:
+            return  # removed while the fetch was running
+        new_title, new_length, new_episodes, new_imdb_rating = info
+        if new_title and new_length:
+            # Same URL → same row in the database; a new URL is a new title
+            key = movie.key if new_url == movie.url else None
+            self.model.edit_movie(row, Movie(new_url, new_title, new_length, new_date, new_platform,
+                                             new_episodes, new_imdb_rating, key))
+        else:
+            QMessageBox.warning(self, "Error", "Failed to fetch movie info.")
 
     def move_up(self):
-        row = self.table.currentRow()
+        row = self._current_row()
         if row > 0:
-            self.manager.move_up(row)
-            self.swap_rows(row, row - 1)
+            if self._sort_col >= 0:
+                self.manager.adopt_order()  # what is on screen becomes the saved order
+            self.model.move_up(row)
+            self._clear_sort()
             self.table.selectRow(row - 1)
 
     def move_down(self):
-        row = self.table.currentRow()
-        if row < self.table.rowCount() - 1:
-            self.manager.move_down(row)
-            self.swap_rows(row, row + 1)
+        row = self._current_row()
+        if 0 <= row < self.model.rowCount() - 1:
+            if self._sort_col >= 0:
+                self.manager.adopt_order()  # what is on screen becomes the saved order
+            self.model.move_down(row)
+            self._clear_sort()
             self.table.selectRow(row + 1)
 
-    def swap_rows(self, row1, row2):
-        self.table.blockSignals(True)
-        for col in range(self.table.columnCount()):
-            item1 = self.table.item(row1, col)
-            item2 = self.table.item(row2, col)
-            text1, text2 = item1.text(), item2.text()
-            fg1, fg2 = item1.foreground(), item2.foreground()
-            bg1, bg2 = item1.background(), item2.background()
-            flags1, flags2 = item1.flags(), item2.flags()
-            key1, key2 = item1.data(Qt.UserRole), item2.data(Qt.UserRole)
-
-            new1 = SortableItem(text2)
-            new1.setTextAlignment(Qt.AlignCenter)
-            new1.setForeground(fg2)
-            new1.setBackground(bg2)
-            new1.setFlags(flags2)
-            new1.setData(Qt.UserRole, key2)
-
-            new2 = SortableItem(text1)
-            new2.setTextAlignment(Qt.AlignCenter)
-            new2.setForeground(fg1)
-            new2.setBackground(bg1)
-            new2.setFlags(flags1)
-            new2.setData(Qt.UserRole, key1)
-
-            self.table.setItem(row1, col, new1)
-            self.table.setItem(row2, col, new2)
-        self.table.blockSignals(False)
+    def _clear_sort(self):
         # Manual reorder clears the active sort so re-sort doesn't undo the move
         self._sort_col = -1
         self.table.horizontalHeader().setSortIndicator(-1, Qt.AscendingOrder)
 
-    def open_link(self, row, column):
-        if column == COL_LINK:
-            item = self.table.item(row, column)
-            if item and item.text():
-                webbrowser.open(item.text())
+    def open_link(self, index):
+        if index.column() == COL_LINK:
+            url = index.data(Qt.DisplayRole)
+            if url:
+                webbrowser.open(url)
 
     def export_movies(self):
-        if self.table.rowCount() == 0:
+        # Adds still fetching have no metadata yet; they aren't exported
+        movies = [m for m in self.manager.movies if m not in self._placeholders]
+        if not movies:
             QMessageBox.warning(self, "Warning", "No movies to export.")
             return
         filepath, _ = QFileDialog.getSaveFileName(self, "Export Movies", "", "JSON Files (*.json)")
         if filepath:
-            movies = []
-            for row in range(self.table.rowCount()):
-                title = self.table.item(row, COL_TITLE).text()
-                length = self.table.item(row, COL_LENGTH).text()
-                episodes = self.table.item(row, COL_EPISODES).text()
-                imdb_rating = self.table.item(row, COL_RATING).text()
-                date = self.table.item(row, COL_DATE).text()
-                platform = self.table.item(row, COL_PLATFORM).text()
-                url = self.table.item(row, COL_LINK).text()
-                movies.append(Movie(url, title, length, date, platform, episodes, imdb_rating))
             try:
                 export_to_json(movies, filepath)
                 QMessageBox.information(self, "Success", "Movies exported successfully.")
@@ -772,39 +1166,61 @@ class MovieWatchlistApp(QWidget):
         if filepath:
             try:
                 imported = import_from_json(filepath)
-                for url, title, length, date, platform, episodes, imdb_rating in imported:
-                    movie = Movie(url, title, length, date, platform, episodes, imdb_rating)
-                    self.manager.add_movie(movie)
-                    self._insert_row(url, title, length, date, platform, episodes, imdb_rating)
-                QMessageBox.information(self, "Success", f"Imported {len(imported)} movies.")
+                # Titles already listed (or repeated in the file) are skipped
+                listed = self._listed_ids()
+                movies = []
+                for row in imported:
+                    movie = Movie(*row)
+                    movie_id = imdb_id(movie.url)
+                    if movie_id in listed:
+                        continue
+                    if movie_id:
+                        listed.add(movie_id)
+                    movies.append(movie)
+                self.model.add_movies(movies)
+                message = f"Imported {len(movies)} movies."
+                if len(movies) < len(imported):
+                    message += f"\nSkipped {len(imported) - len(movies)} already in your watchlist."
+                QMessageBox.information(self, "Success", message)
             except Exception as e:
                 QMessageBox.critical(self, "Error", f"Failed to import: {e}")
 
     def closeEvent(self, event):
-        self.manager.movies.clear()
-        for row in range(self.table.rowCount()):
-            title = self.table.item(row, COL_TITLE).text()
-            length = self.table.item(row, COL_LENGTH).text()
-            episodes = self.table.item(row, COL_EPISODES).text()
-            imdb_rating = self.table.item(row, COL_RATING).text()
-            date = self.table.item(row, COL_DATE).text()
-            platform = self.table.item(row, COL_PLATFORM).text()
-            url_item = self.table.item(row, COL_LINK)
-            url = url_item.text() if url_item else ""
-            self.manager.add_movie(Movie(url, title, length, date, platform, episodes, imdb_rating))
-        save_movies(self.manager.movies)
+        self._refresh_timer.stop()
+        if self.sync_worker is not None and not self.sync_worker.wait(SYNC_CLOSE_WAIT_MS):
+            # Still talking to Drive: let it finish in the background, but
+            # nothing it brings back is applied any more
+            self._sync_abandoned = True
+        if self._refresh_worker is not None and self._refresh_worker.isRunning():
+            # The refresh is optional: drop its results rather than keep the
+            # window frozen while it finishes (they are fetched again next time)
+            self._refresh_abandoned = True
+            self._refresh_worker.requestInterruption()
+        # Let in-flight adds/edits land so they are saved with everything else
+        if self._fetch_workers:
+            self.hide()
+            for worker in list(self._fetch_workers):
+                worker.wait()
+            QApplication.processEvents()
+        save_movies([m for m in self.manager.movies if m not in self._placeholders])
         self._save_settings()
 
-        # Push updated db to Google Drive (silent if not configured)
+        # Push this session's changes to Google Drive (silent if not
+        # configured).  It runs in its own process so the window closes
+        # immediately.
         try:
             if is_configured():
-                upload_db("watchlist.db")
+                from cloud_sync import sync_detached
+
+                sync_detached("watchlist.db")
         except Exception as e:
             print(f"Cloud sync upload skipped: {e}")
 
         event.accept()
         # If a staged update is waiting, rename-swap and relaunch now that
         # all data is saved. Windows allows renaming a running exe safely.
+        from updater import do_staged_update
+
         do_staged_update()
 
 
@@ -859,27 +1275,69 @@ class EditDialog(QDialog):
 
 
 def run_app():
-    # Remove _old_version.exe left over from a previous update (if any)
-    cleanup_old_version()
+    with phase("QApplication"):
+        app = QApplication(sys.argv)
+
+    # Pull changes from Google Drive in the background (silent if not
+    # configured).  The window opens from the local copy straight away and
+    # reloads if other devices changed the list.
+    window = None
+    syncer = None
+    if is_configured() and not is_signed_in():
+        # First run: the browser sign-in happens here, on the GUI thread,
+        # never on the sync worker
+        try:
+            from cloud_sync import sign_in
 
-    # Pull latest db from Google Drive before opening (silent if not configured)
-    try:
-        if is_configured():
-            download_db("watchlist.db")
-    except Exception as e:
-        print(f"Cloud sync download skipped: {e}")
+            sign_in()
+        except Exception as e:
+            print(f"Cloud sync sign-in skipped: {e}")
+    if is_signed_in():
+        startup_trace.mark("sync worker started")
+        syncer = SyncDownloadWorker("watchlist.db", bootstrap=not os.path.exists("watchlist.db"))
+        # Queued to the GUI thread, so they can't arrive before window exists
+        syncer.downloaded.connect(lambda path: window.apply_downloaded_db(path))
+        syncer.journal_received.connect(
+            lambda entries, files: window.apply_remote_journal(entries, files))
+        syncer.start()
 
-    init_db()
-    app = QApplication(sys.argv)
-    app.setStyleSheet(APP_STYLE)
-    window = MovieWatchlistApp()
-    window.show()
+    # Remove _old_version.exe left over from a previous update (if any)
+    with phase("cleanup_old_version"):
+        from updater import cleanup_old_version
+
+        cleanup_old_version()
+
+    with phase("init_db"):
+        init_db()
+    with phase("setStyleSheet"):
+        app.setStyleSheet(APP_STYLE)
+    with phase("MovieWatchlistApp"):
+        window = MovieWatchlistApp()
+    window.sync_worker = syncer
+    with phase("show"):
+        window.show()
+
+    # Opt-in startup timeline (see startup_trace): saved once the event loop
+    # is running, and again on exit to catch the background phases.
+    if startup_trace.is_enabled():
+        def write_trace(label):
+            startup_trace.mark(label)
+            print(f"Startup trace written to {startup_trace.write()}")
+
+        QTimer.singleShot(0, lambda: write_trace("event loop running"))
+        app.aboutToQuit.connect(lambda: write_trace("quit"))
 
     # Background update check — fires 2 s after startup so it never blocks the UI
     _checker = UpdateCheckWorker()
     _checker.update_available.connect(
-        lambda tag, url: UpdateDialog(tag, url, window).exec()
+        lambda tag, url, sha256, delta_url: UpdateDialog(tag, url, sha256, delta_url, window).exec()
     )
     QTimer.singleShot(2000, _checker.start)
 
-    sys.exit(app.exec())
+    status = app.exec()
+    # The window is gone; each of these is down to its last request
+    if syncer is not None:
+        syncer.wait()
+    if window._refresh_worker is not None:
+        window._refresh_worker.wait()
+    sys.exit(status)
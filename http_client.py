@@ -0,0 +1,101 @@
+"""
+Shared HTTP session for every requests-based network call in the app
+(OMDb, TVMaze, IMDb and GitHub).
+
+A single requests.Session keeps TCP/TLS connections alive between calls, so
+a series lookup (OMDb + two TVMaze requests) or a batch of lookups reuses
+the same sockets instead of handshaking for every request.  Transient
+failures (connection errors, 429 and 5xx responses) are retried with
+exponential backoff; see configure().
+
+requests itself is imported when the session is first built, so importing
+this module (and the modules built on it) costs next to nothing at startup.
+"""
+
+import threading
+
+# Keep-alive connections kept open per host.  Sized to match how many
+# requests the app sends to each host at once (see imdb_fetcher._SERVICE_LIMITS).
+_POOL_SIZES = {
+    "http://www.omdbapi.com": 4,
+    "https://www.omdbapi.com": 4,
+    "https://api.tvmaze.com": 6,
+    "https://www.imdb.com": 2,
+    "https://api.github.com": 1,
+    "https://github.com": 1,
+}
+_DEFAULT_POOL_SIZE = 4
+
+_retries = 2
+_backoff = 0.3
+_session = None
+_lock = threading.Lock()
+
+
+def configure(retries=None, backoff=None):
+    """Change the retry policy; the session is rebuilt on next use.
+
+    retries — how many times a failed request is retried (0 disables).
+    backoff — base delay in seconds; retry n waits backoff * 2**(n-1).
+    """
+    global _retries, _backoff, _session
+    with _lock:
+        if retries is not None:
+            _retries = retries
+        if backoff is not None:
+            _backoff = backoff
+        if _session is not None:
+            _session.close()
+        _session = None
+
+
+def _adapter(pool_size):
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    # Only failed connections and 429/5xx answers are retried.  A read that
+    # times out is not: the host is up but stalled, and asking again would
+    # multiply the wait (and hold the caller's concurrency slot) instead of
+    # failing after one timeout.
+    retry = Retry(
+        total=_retries,
+        read=0,
+        backoff_factor=_backoff,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset(["GET", "HEAD"]),
+        raise_on_status=False,
+    )
+    return HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+
+
+def get_session():
+    """Return the process-wide pooled session, creating it on first use."""
+    global _session
+    with _lock:
+        if _session is None:
+            import requests
+
+            session = requests.Session()
+            session.mount("http://", _adapter(_DEFAULT_POOL_SIZE))
+            session.mount("https://", _adapter(_DEFAULT_POOL_SIZE))
+            for prefix, size in _POOL_SIZES.items():
+                session.mount(prefix, _adapter(size))
+            _session = session
+        return _session
+
+
+def get(url, etag=None, last_modified=None, **kwargs):
+    """requests.get over the shared session.
+
+    Pass the ETag and/or Last-Modified header of an earlier response to make
+    the request conditional: a 304 status then means the resource has not
+    changed and the response has no body.
+    """
+    if etag or last_modified:
+        headers = dict(kwargs.pop("headers", None) or {})
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        kwargs["headers"] = headers
+    return get_session().get(url, **kwargs)
@@ -1,108 +1,532 @@
+import os
 import re
-import requests
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+
+import http_client
 
 _HEADERS = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
     "Accept-Language": "en-US,en;q=0.9",
 }
 
+CACHE_DB = "metadata_cache.db"
+
+# How long each cached field stays fresh, in seconds (None = never expires).
+# Title and runtime don't change once a title is out; ratings drift slowly and
+# running series gain episodes.  The episode count of a series TVMaze reports
+# as ended never expires (see _is_fresh).
+_TTL = {
+    "title": None,
+    "runtime": None,
+    "imdb_rating": 7 * 24 * 3600,
+    "episodes": 24 * 3600,
+}
+_MEMORY_CACHE_SIZE = 512
+
+# Where each source lives.  Overridable with environment variables (or
+# set_base_urls) to point the app at local stand-ins, see fake_servers.py.
+OMDB_URL = os.environ.get("WATCHLIST_OMDB_URL", "http://www.omdbapi.com")
+TVMAZE_URL = os.environ.get("WATCHLIST_TVMAZE_URL", "https://api.tvmaze.com")
+IMDB_URL = os.environ.get("WATCHLIST_IMDB_URL", "https://www.imdb.com")
+_NOT_ON_TVMAZE = 0  # cached tvmaze_id for series TVMaze has no entry for
+# IMDb pages are read in chunks and the download stops once the episode
+# count turns up (the schema.org block is near the top of the page).
+_SCRAPE_CHUNK = 16 * 1024
+
+# Simultaneous requests allowed per source when lookups run in parallel
+# (fetch_many).  OMDb's free keys and IMDb's HTML pages are the touchiest.
+# Keyed by source rather than host, so each keeps its own limit even when
+# the base URLs point at one server (fake_servers.py).
+_SERVICE_LIMITS = {
+    "omdb": 4,
+    "tvmaze": 6,
+    "imdb": 2,
+}
+_service_slots = {name: threading.BoundedSemaphore(limit)
+                  for name, limit in _SERVICE_LIMITS.items()}
+
+
+def set_base_urls(omdb=None, tvmaze=None, imdb=None):
+    """Point lookups at other servers; None keeps the current URL."""
+    global OMDB_URL, TVMAZE_URL, IMDB_URL
+    OMDB_URL = (omdb or OMDB_URL).rstrip("/")
+    TVMAZE_URL = (tvmaze or TVMAZE_URL).rstrip("/")
+    IMDB_URL = (imdb or IMDB_URL).rstrip("/")
+
+
+def _get(service, url, **kwargs):
+    """GET over the shared session, throttled to service's concurrency limit
+    ("omdb", "tvmaze" or "imdb", see _SERVICE_LIMITS)."""
+    with _service_slots[service]:
+        return http_client.get(url, **kwargs)
+
 
-def _get_episode_count(imdb_id, imdb_url):
+@contextmanager
+def _stream(service, url, **kwargs):
+    """Streamed GET as a context manager.  Unlike _get, the service's slot
+    is held until the body has been read and the response closed."""
+    with _service_slots[service]:
+        resp = http_client.get(url, stream=True, **kwargs)
+        try:
+            yield resp
+        finally:
+            resp.close()
+
+
+class _MetadataCache:
+    """tt id → metadata dict, with an in-memory LRU in front of a SQLite table.
+
+    Entries hold title, runtime, kind, imdb_rating and episodes plus the time
+    the OMDb fields (info_fetched_at) and the episode count
+    (episodes_fetched_at) were last fetched, so each field can expire on its
+    own schedule.  Series also keep their TVMaze show id and status
+    (tvmaze_id, show_status), so later counts skip the lookup, and the ETag
+    of the show's season list (tvmaze_etag) for conditional recounts.
+    """
+    _FIELDS = ("kind", "title", "runtime", "imdb_rating", "episodes",
+               "info_fetched_at", "episodes_fetched_at", "tvmaze_id", "show_status",
+               "tvmaze_etag")
+    # Columns added after the table was first released: name → SQL type
+    _ADDED_COLUMNS = {"tvmaze_id": "INTEGER", "show_status": "TEXT", "tvmaze_etag": "TEXT"}
+
+    def __init__(self, path, size):
+        self.path = path
+        self.size = size
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._initialized = False
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10)
+        if not self._initialized:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS metadata (
+                    imdb_id TEXT PRIMARY KEY,
+                    kind TEXT,
+                    title TEXT,
+                    runtime TEXT,
+                    imdb_rating TEXT,
+                    episodes TEXT,
+                    info_fetched_at REAL,
+                    episodes_fetched_at REAL
+                )
+            """)
+            existing = {row[1] for row in conn.execute("PRAGMA table_info(metadata)")}
+            for column, sql_type in self._ADDED_COLUMNS.items():
+                if column not in existing:
+                    conn.execute(f"ALTER TABLE metadata ADD COLUMN {column} {sql_type}")
+            conn.commit()
+            self._initialized = True
+        return conn
+
+    def get(self, imdb_id):
+        with self._lock:
+            entry = self._memory.get(imdb_id)
+            if entry is not None:
+                self._memory.move_to_end(imdb_id)
+                return dict(entry)
+        try:
+            conn = self._connect()
+            try:
+                row = conn.execute(
+                    f"SELECT {', '.join(self._FIELDS)} FROM metadata WHERE imdb_id = ?",
+                    (imdb_id,)
+                ).fetchone()
+            finally:
+                conn.close()
+        except sqlite3.Error:
+            return None
+        if row is None:
+            return None
+        entry = dict(zip(self._FIELDS, row))
+        self._remember(imdb_id, entry)
+        return dict(entry)
+
+    def put(self, imdb_id, entry):
+        self._remember(imdb_id, entry)
+        try:
+            conn = self._connect()
+            try:
+                with conn:
+                    conn.execute(
+                        f"INSERT OR REPLACE INTO metadata (imdb_id, {', '.join(self._FIELDS)}) "
+                        f"VALUES (?, {', '.join('?' for _ in self._FIELDS)})",
+                        (imdb_id,) + tuple(entry.get(f) for f in self._FIELDS)
+                    )
+            finally:
+                conn.close()
+        except sqlite3.Error:
+            pass  # the cache is an optimisation; never fail a fetch over it
+
+    def _remember(self, imdb_id, entry):
+        with self._lock:
+            self._memory[imdb_id] = dict(entry)
+            self._memory.move_to_end(imdb_id)
+            while len(self._memory) > self.size:
+                self._memory.popitem(last=False)
+
+
+_cache = _MetadataCache(CACHE_DB, _MEMORY_CACHE_SIZE)
+
+
+def _is_fresh(entry, field, now):
+    ttl = _TTL[field]
+    stamp = entry.get("episodes_fetched_at" if field == "episodes" else "info_fetched_at")
+    if stamp is None:
+        return False
+    if field == "episodes" and entry.get("show_status") == "Ended":
+        return True
+    return ttl is None or now - stamp < ttl
+
+
+def _tvmaze_episode_count(imdb_id, entry):
+    """Episode count from TVMaze as an int, or None.
+
+    The show id (and status) is looked up once and kept in entry; after that
+    a count costs one small request for the show with its season list,
+    whose episodeOrder fields are summed.  Only a season without an
+    episodeOrder yet (typically the one airing) has its episodes listed.
+    When every season had an episodeOrder, the recount is a conditional
+    request and an unchanged season list (304) costs no body at all.
+    """
+    show_id = entry.get("tvmaze_id")
+    if show_id is None:
+        r = _get("tvmaze", f"{TVMAZE_URL}/lookup/shows?imdb={imdb_id}", timeout=6)
+        if r.status_code == 404:
+            entry["tvmaze_id"] = _NOT_ON_TVMAZE
+            return None
+        if r.status_code != 200:
+            return None
+        show_id = entry["tvmaze_id"] = r.json().get("id")
+    if not show_id:
+        return None
+
+    known = _parse_count(entry.get("episodes"))
+    etag = entry.get("tvmaze_etag") if known else None
+    r = _get("tvmaze", f"{TVMAZE_URL}/shows/{show_id}?embed=seasons", timeout=6, etag=etag)
+    if r.status_code == 304:
+        return known
+    if r.status_code != 200:
+        return None
+    show = r.json()
+    entry["show_status"] = show.get("status")
+    entry["tvmaze_etag"] = r.headers.get("ETag")
+    total = 0
+    for season in show.get("_embedded", {}).get("seasons", []):
+        order = season.get("episodeOrder")
+        if order is None:
+            # This season's count can change without the season list changing
+            entry["tvmaze_etag"] = None
+            r = _get("tvmaze", f"{TVMAZE_URL}/seasons/{season['id']}/episodes", timeout=6)
+            if r.status_code != 200:
+                return None
+            # Specials come with this list but have no episode number
+            order = sum(1 for episode in r.json() if episode.get("number") is not None)
+        total += order
+    return total or None
+
+
+def _parse_count(episodes):
+    try:
+        return int(episodes)
+    except (TypeError, ValueError):
+        return None
+
+
+def _imdb_episode_count(imdb_id):
+    """Episode count scraped from the IMDB page as a string, or None."""
+    patterns = (
+        # JSON-LD schema.org field — present in server-rendered HTML
+        re.compile(r'"numberOfEpisodes"\s*:\s*(\d+)'),
+        # hero subnav span — only present when JS-rendered, kept as last resort
+        re.compile(r'data-testid="hero-subnav-bar-series-episode-count"[^>]*>\s*(\d+)'),
+    )
+    with _stream("imdb", f"{IMDB_URL}/title/{imdb_id}/", headers=_HEADERS, timeout=10) as resp:
+        resp.encoding = resp.encoding or "utf-8"
+        html = ""
+        for chunk in resp.iter_content(_SCRAPE_CHUNK, decode_unicode=True):
+            # Only rescan the new chunk (plus enough overlap for a match cut in two)
+            start = max(0, len(html) - 64)
+            html += chunk
+            m = patterns[0].search(html, start)
+            if m:
+                return m.group(1)
+        m = patterns[1].search(html)
+        return m.group(1) if m else None
+
+
+def _get_episode_count(imdb_id, entry):
     """Return total episode count string, or '-' on failure.
 
     Tries TVMaze first (reliable, JS-free JSON API), then falls back to
     scraping the IMDB page for the numberOfEpisodes schema.org field.
+    entry is the title's cache entry; the TVMaze show id and status are
+    stored in it.
     """
     # ── TVMaze (primary) ────────────────────────────────────────────────────
     try:
-        r1 = requests.get(
-            f"https://api.tvmaze.com/lookup/shows?imdb={imdb_id}",
-            timeout=6,
-        )
-        if r1.status_code == 200:
-            show_id = r1.json().get("id")
-            if show_id:
-                r2 = requests.get(
-                    f"https://api.tvmaze.com/shows/{show_id}/episodes",
-                    timeout=6,
-                )
-                if r2.status_code == 200:
-                    count = len(r2.json())
-                    if count:
-                        return str(count)
+        count = _tvmaze_episode_count(imdb_id, entry)
+        if count:
+            return str(count)
     except Exception:
         pass
 
     # ── IMDB page scrape (fallback) ─────────────────────────────────────────
     try:
-        resp = requests.get(imdb_url, headers=_HEADERS, timeout=10)
-        html = resp.text
-        # JSON-LD schema.org field — present in server-rendered HTML
-        m = re.search(r'"numberOfEpisodes"\s*:\s*(\d+)', html)
-        if m:
-            return m.group(1)
-        # hero subnav span — only present when JS-rendered, kept as last resort
-        m = re.search(
-            r'data-testid="hero-subnav-bar-series-episode-count"[^>]*>\s*(\d+)',
-            html,
-        )
-        if m:
-            return m.group(1)
+        count = _imdb_episode_count(imdb_id)
+        if count:
+            return count
     except Exception:
         pass
 
     return "-"
 
 
-def fetch_movie_info(imdb_url):
+def _format_runtime(runtime):
+    """Turn OMDb's "125 min" into "2h 5m(125 min)"."""
+    if runtime and runtime != "N/A":
+        min_match = re.match(r'(\d+)\s*min', runtime)
+        if min_match:
+            total_mins = int(min_match.group(1))
+            hours = total_mins // 60
+            mins = total_mins % 60
+            if hours and mins:
+                return f"{hours}h {mins}m({total_mins} min)"
+            elif hours:
+                return f"{hours}h({total_mins} min)"
+            else:
+                return f"{mins}m({total_mins} min)"
+    return runtime
+
+
+_OMDB_KEYS = ("c7921dc6", "f84fc31d", "68fd98ab", "trilogy")
+_OMDB_TIMEOUT = 10       # seconds for a whole lookup, however many keys it tries
+_HEDGE_AFTER = 2.0       # seconds before a slow key gets raced by the next one
+_HEDGE_MIN = 0.5
+_BREAKER_FAILURES = 3    # consecutive failures that take a key out of rotation
+# How long a key stays out of rotation, by what went wrong
+_BREAKER_COOLDOWN = {"error": 5 * 60, "quota": 60 * 60, "invalid": 24 * 3600}
+
+
+class _KeyScheduler:
+    """Chooses which OMDb API keys a lookup uses, and in what order.
+
+    Tracks successes, failures and average latency per key.  Keys take
+    turns leading (round-robin).  A key that keeps failing, or that reports
+    its quota used up or itself invalid, is skipped until its cooldown ends
+    (circuit breaker).  After the cooldown it is tried again, and a single
+    further failure takes it straight back out.
+    """
+
+    def __init__(self, keys):
+        self._lock = threading.Lock()
+        self._turn = 0
+        self._stats = {
+            key: {"successes": 0, "failures": 0, "consecutive_failures": 0,
+                  "latency": None, "open_until": 0.0}
+            for key in keys
+        }
+
+    def candidates(self):
+        """Keys to try for one lookup, in order.  If every key is cooling
+        down, only the one closest to coming back is returned."""
+        now = time.monotonic()
+        with self._lock:
+            keys = list(self._stats)
+            start = self._turn % len(keys)
+            self._turn += 1
+            keys = keys[start:] + keys[:start]
+            usable = [k for k in keys if self._stats[k]["open_until"] <= now]
+            return usable or [min(keys, key=lambda k: self._stats[k]["open_until"])]
+
+    def hedge_delay(self, key):
+        """How long to wait on key before racing the next key against it."""
+        with self._lock:
+            latency = self._stats[key]["latency"]
+        if latency is None:
+            return _HEDGE_AFTER
+        return min(_HEDGE_AFTER, max(_HEDGE_MIN, 3 * latency))
+
+    def record_success(self, key, latency):
+        with self._lock:
+            stats = self._stats[key]
+            stats["successes"] += 1
+            stats["consecutive_failures"] = 0
+            stats["open_until"] = 0.0
+            previous = stats["latency"]
+            stats["latency"] = latency if previous is None else 0.8 * previous + 0.2 * latency
+
+    def record_failure(self, key, reason="error"):
+        """reason is "error" (timeouts, bad responses), "quota" or "invalid"."""
+        with self._lock:
+            stats = self._stats[key]
+            stats["failures"] += 1
+            stats["consecutive_failures"] += 1
+            if reason != "error" or stats["consecutive_failures"] >= _BREAKER_FAILURES:
+                stats["open_until"] = time.monotonic() + _BREAKER_COOLDOWN[reason]
+
+    def stats(self):
+        with self._lock:
+            return {key: dict(stats) for key, stats in self._stats.items()}
+
+
+_omdb_keys = _KeyScheduler(_OMDB_KEYS)
+# Runs the individual key requests of a lookup, so a slow one can be raced
+_omdb_pool = ThreadPoolExecutor(max_workers=16, thread_name_prefix="omdb")
+
+
+def _omdb_request(imdb_id, key, timeout):
+    """One OMDb request with one key, recorded in _omdb_keys.
+
+    Returns ("ok", info dict), ("missing", None) when OMDb answers that the
+    title doesn't exist, or ("failed", None).
+    """
+    start = time.monotonic()
+    try:
+        response = _get("omdb", f"{OMDB_URL}/?i={imdb_id}&apikey={key}", timeout=timeout)
+        data = response.json()
+    except Exception:
+        _omdb_keys.record_failure(key)
+        return "failed", None
+
+    if data.get("Response") == "True":
+        _omdb_keys.record_success(key, time.monotonic() - start)
+        return "ok", {
+            "kind": data.get("Type"),
+            "title": data.get("Title", "Unknown Title"),
+            "runtime": _format_runtime(data.get("Runtime", "N/A")),
+            "imdb_rating": data.get("imdbRating") or "-",
+        }
+    error = (data.get("Error") or "").lower()
+    if "limit" in error:
+        _omdb_keys.record_failure(key, "quota")
+    elif "api key" in error:
+        _omdb_keys.record_failure(key, "invalid")
+    elif "not found" in error or "incorrect imdb id" in error:
+        _omdb_keys.record_success(key, time.monotonic() - start)
+        return "missing", None
+    else:
+        _omdb_keys.record_failure(key)
+    return "failed", None
+
+
+def _fetch_omdb(imdb_id):
+    """Return a dict with kind, title, runtime and imdb_rating, or None.
+
+    Keys come from _omdb_keys.  When a key fails the next one is tried at
+    once, and when it is merely slow the next one is started alongside it
+    (a hedged request) and whichever answers first wins, with at most two
+    requests in flight.  The whole lookup gives up after _OMDB_TIMEOUT.
+    """
+    keys = _omdb_keys.candidates()
+    deadline = time.monotonic() + _OMDB_TIMEOUT
+    pending = {}
+
+    def launch():
+        key = keys.pop(0)
+        timeout = max(deadline - time.monotonic(), 0.1)
+        pending[_omdb_pool.submit(_omdb_request, imdb_id, key, timeout)] = key
+
+    launch()
+    while pending:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        wait_for = remaining
+        if keys and len(pending) == 1:
+            wait_for = min(remaining, _omdb_keys.hedge_delay(next(iter(pending.values()))))
+        done, _ = wait(pending, timeout=wait_for, return_when=FIRST_COMPLETED)
+        for future in done:
+            del pending[future]
+            status, info = future.result()
+            if status == "ok":
+                return info
+            if status == "missing":
+                return None
+        if keys and len(pending) < 2:
+            # A key failed, or the one in flight is slow: bring in the next
+            launch()
+    # Requests still running finish in the background and update the key stats
+    return None
+
+
+def fetch_movie_info(imdb_url, refresh=False):
     """Fetch title, runtime, episode count, and IMDb rating from an IMDB URL.
 
+    Results are cached per tt id (see _TTL); only fields that have expired
+    are fetched again, and refresh=True ignores the cache entirely.  When a
+    refetch fails the last known values are returned instead.
+
     Returns (title, runtime, episodes, imdb_rating).
     Returns (None, None, None, None) on failure.
     """
     try:
         match = re.search(r'(tt\d+)', imdb_url)
         if not match:
-            return None, None, None
+            return None, None, None, None
 
         imdb_id = match.group(1)
-        api_keys = ["c7921dc6", "f84fc31d", "68fd98ab", "trilogy"]
+        now = time.time()
+        entry = None if refresh else _cache.get(imdb_id)
+        changed = False
 
-        for api_key in api_keys:
-            try:
-                api_url = f"http://www.omdbapi.com/?i={imdb_id}&apikey={api_key}"
-                response = requests.get(api_url, timeout=10)
-                data = response.json()
-
-                if data.get("Response") == "True":
-                    title = data.get("Title", "Unknown Title")
-                    runtime = data.get("Runtime", "N/A")
-
-                    if runtime and runtime != "N/A":
-                        min_match = re.match(r'(\d+)\s*min', runtime)
-                        if min_match:
-                            total_mins = int(min_match.group(1))
-                            hours = total_mins // 60
-                            mins = total_mins % 60
-                            if hours and mins:
-                                runtime = f"{hours}h {mins}m({total_mins} min)"
-                            elif hours:
-                                runtime = f"{hours}h({total_mins} min)"
-                            else:
-                                runtime = f"{mins}m({total_mins} min)"
-
-                    episodes = "-"
-                    if data.get("Type") == "series":
-                        episodes = _get_episode_count(imdb_id, imdb_url)
-
-                    imdb_rating = data.get("imdbRating") or "-"
-
-                    return title, runtime, episodes, imdb_rating
-            except Exception:
-                continue
+        if entry is None or not _is_fresh(entry, "imdb_rating", now):
+            info = _fetch_omdb(imdb_id)
+            if info:
+                entry = dict(entry or {}, info_fetched_at=now, **info)
+                changed = True
+            elif entry is None:
+                return None, None, None, None
 
-        return None, None, None, None
+        if entry.get("kind") != "series":
+            entry["episodes"] = "-"
+        elif not _is_fresh(entry, "episodes", now):
+            show = (entry.get("tvmaze_id"), entry.get("show_status"), entry.get("tvmaze_etag"))
+            episodes = _get_episode_count(imdb_id, entry)
+            if episodes != "-" or not entry.get("episodes"):
+                entry["episodes"] = episodes
+                entry["episodes_fetched_at"] = now
+                changed = True
+            elif show != (entry.get("tvmaze_id"), entry.get("show_status"), entry.get("tvmaze_etag")):
+                changed = True
+
+        if changed:
+            _cache.put(imdb_id, entry)
+        return entry["title"], entry["runtime"], entry["episodes"], entry["imdb_rating"]
 
     except Exception as e:
         print(f"Error fetching movie info: {e}")
         return None, None, None, None
+
+
+def fetch_many(urls, max_workers=8, refresh=False):
+    """Fetch metadata for several IMDB URLs concurrently.
+
+    Lookups run on a thread pool of max_workers, with requests to each
+    source (OMDb, TVMaze, IMDb) further capped by _SERVICE_LIMITS.  Yields (url, info, error) as each
+    lookup completes: info is the fetch_movie_info tuple and error is None,
+    or info is None and error describes why that item failed.  A failing
+    item never aborts the rest of the batch.
+    """
+    pool = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        futures = {pool.submit(fetch_movie_info, url, refresh): url for url in urls}
+        for future in as_completed(futures):
+            url = futures[future]
+            try:
+                info = future.result()
+            except Exception as e:
+                yield url, None, str(e)
+                continue
+            if info[0]:
+                yield url, info, None
+            else:
+                yield url, None, "Failed to fetch movie data."
+    finally:
+        # If the caller stops iterating early, drop lookups not yet started
+        pool.shutdown(wait=False, cancel_futures=True)
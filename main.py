@@ -1,4 +1,16 @@
-from gui import run_app
+import sys
 
 if __name__ == "__main__":
-    run_app()
\ No newline at end of file
+    from cloud_sync import SYNC_ARG
+
+    if len(sys.argv) > 2 and sys.argv[1] == SYNC_ARG:
+        # Background Drive sync started by the closing window
+        from cloud_sync import run_detached_sync
+        run_detached_sync(sys.argv[2])
+    else:
+        import startup_trace
+
+        startup_trace.enable_from(sys.argv)
+        with startup_trace.phase("import gui"):
+            from gui import run_app
+        run_app()
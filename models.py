@@ -1,5 +1,68 @@
+import re
+import time
+from datetime import date
+
+_RUNTIME_RE = re.compile(r'\((\d+)\s*min\)')
+_IMDB_ID_RE = re.compile(r'(tt\d+)')
+
+
+def imdb_id(url):
+    """The IMDb tt id in a URL, or None."""
+    m = _IMDB_ID_RE.search(url or "")
+    return m.group(1) if m else None
+
+
+def _parse_runtime(length):
+    """Minutes from a runtime string like "2h 5m(125 min)", or None."""
+    m = _RUNTIME_RE.search(length or "")
+    return int(m.group(1)) if m else None
+
+
+def _parse_date(date_str):
+    """date.toordinal() of a dd/MM/yyyy string, or None if empty/invalid."""
+    try:
+        day, month, year = date_str.split("/")
+        return date(int(year), int(month), int(day)).toordinal()
+    except (AttributeError, ValueError):
+        return None
+
+
+def _parse_number(text, kind):
+    try:
+        return kind(text)
+    except (TypeError, ValueError):
+        return None
+
+
 class Movie:
-    def __init__(self, url, title, length, watch_date, platform="", episodes="-", imdb_rating="-"):
+    """One watchlist entry.
+
+    The display strings are stored as given; their numeric forms are parsed
+    once, whenever the string is set, so sorting and the Days Left column
+    never re-parse text:
+      runtime_minutes — int or None
+      watch_ordinal   — date.toordinal() of watch_date, or None
+      rating          — float or None
+      episode_count   — int or None
+
+    key is the movie's identity in watchlist.db (database.save_movies), or
+    None for a movie that hasn't been saved yet; position is its place in
+    the saved order (sparse, possibly fractional — see MovieManager), or
+    None until it is placed.  edited_at maps field names
+    to when they were last edited (see touch); save_movies journals each
+    change with that time rather than the time of the save.
+    """
+    __slots__ = ("url", "title", "platform", "key", "position", "edited_at",
+                 "_length", "_watch_date", "_episodes", "_imdb_rating",
+                 "runtime_minutes", "watch_ordinal", "rating", "episode_count")
+    # The stored fields, in constructor order
+    FIELDS = ("url", "title", "length", "watch_date", "platform", "episodes", "imdb_rating")
+
+    def __init__(self, url, title, length, watch_date, platform="", episodes="-", imdb_rating="-",
+                 key=None, position=None):
+        self.key = key
+        self.position = position
+        self.edited_at = {}
         self.url = url
         self.title = title
         self.length = length
@@ -7,3 +70,45 @@ class Movie:
         self.platform = platform
         self.episodes = episodes
         self.imdb_rating = imdb_rating
+
+    def touch(self, *fields):
+        """Record that these fields (attribute names) were edited just now."""
+        now = time.time()
+        for field in fields:
+            self.edited_at[field] = now
+
+    @property
+    def length(self):
+        return self._length
+
+    @length.setter
+    def length(self, value):
+        self._length = value
+        self.runtime_minutes = _parse_runtime(value)
+
+    @property
+    def watch_date(self):
+        return self._watch_date
+
+    @watch_date.setter
+    def watch_date(self, value):
+        self._watch_date = value
+        self.watch_ordinal = _parse_date(value)
+
+    @property
+    def episodes(self):
+        return self._episodes
+
+    @episodes.setter
+    def episodes(self, value):
+        self._episodes = value
+        self.episode_count = _parse_number(value, int)
+
+    @property
+    def imdb_rating(self):
+        return self._imdb_rating
+
+    @imdb_rating.setter
+    def imdb_rating(self, value):
+        self._imdb_rating = value
+        self.rating = _parse_number(value, float)
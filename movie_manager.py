@@ -14,11 +14,64 @@ class MovieManager:
     def move_up(self, index):
         if index > 0:
             self.movies[index - 1], self.movies[index] = self.movies[index], self.movies[index - 1]
+            self._place(index - 1)
 
     def move_down(self, index):
         if index < len(self.movies) - 1:
             self.movies[index + 1], self.movies[index] = self.movies[index], self.movies[index + 1]
+            self._place(index + 1)
 
     def edit_movie(self, index, new_movie):
         if 0 <= index < len(self.movies):
             self.movies[index] = new_movie
+
+    def adopt_order(self):
+        """Make the current list order the saved order, e.g. once rows of a
+        sorted view are moved by hand.  Positions are only rewritten if the
+        list is not already in position order."""
+        self._assign_new_positions()
+        positions = [movie.position for movie in self.movies]
+        if any(a >= b for a, b in zip(positions, positions[1:])):
+            for i, movie in enumerate(self.movies):
+                movie.position = float(i)
+
+    def _place(self, index):
+        """Give the movie just moved to index a position between its
+        neighbours', so a move normally changes one saved row.
+
+        Positions (Movie.position) are the saved order and may be
+        fractional.  Movies not saved yet get theirs first.  When there is
+        no room left between the neighbours (or they are out of order), the
+        smallest window of rows around index that fits is spread out evenly
+        instead.
+        """
+        movies = self.movies
+        if any(movie.position is None for movie in movies[max(index - 1, 0):index + 2]):
+            self._assign_new_positions()
+        k = 0
+        while True:
+            lo, hi = max(index - k, 0), min(index + k, len(movies) - 1)
+            before = movies[lo - 1].position if lo > 0 else None
+            after = movies[hi + 1].position if hi + 1 < len(movies) else None
+            count = hi - lo + 1
+            if before is None and after is None:
+                before, after = -1.0, float(count)
+            elif before is None:
+                before = after - count - 1
+            elif after is None:
+                after = before + count + 1
+            step = (after - before) / (count + 1)
+            if step > 1e-9 * max(1.0, abs(before), abs(after)):
+                for i in range(count):
+                    movies[lo + i].position = before + step * (i + 1)
+                return
+            k = k * 2 or 1
+
+    def _assign_new_positions(self):
+        """Number the movies without a position after all the others."""
+        next_position = max((m.position for m in self.movies if m.position is not None),
+                            default=-1) + 1
+        for movie in self.movies:
+            if movie.position is None:
+                movie.position = next_position
+                next_position += 1
@@ -0,0 +1,116 @@
+"""
+Opt-in timeline of the app's startup phases.
+
+Run with WATCHLIST_TRACE=<file> in the environment, or pass
+--trace-startup[=<file>] to main.py, and every phase wrapped in phase() is
+recorded with its wall-clock and CPU time.  The result is written as a
+Chrome trace-event JSON file (open it in chrome://tracing or
+https://ui.perfetto.dev) once the window is up, and again on exit so
+background phases that finish later are included too.
+
+When tracing is off, phase() does nothing but check a flag.
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+ENV_VAR = "WATCHLIST_TRACE"
+CLI_FLAG = "--trace-startup"
+DEFAULT_PATH = "startup_trace.json"
+
+_origin = time.perf_counter()  # trace timestamps count from this module's import
+_events = None                 # list of trace events while tracing is on
+_path = None
+_lock = threading.Lock()
+
+
+def enable(path=None):
+    """Start recording; write() will save to path (DEFAULT_PATH if None)."""
+    global _events, _path
+    with _lock:
+        if _events is None:
+            _events = []
+        _path = path or DEFAULT_PATH
+
+
+def enable_from(argv):
+    """Turn tracing on if ENV_VAR is set or argv holds CLI_FLAG.
+
+    The flag is removed from argv so Qt never sees it.  Returns True if
+    tracing is on.
+    """
+    path = os.environ.get(ENV_VAR)
+    for arg in list(argv[1:]):
+        if arg == CLI_FLAG or arg.startswith(CLI_FLAG + "="):
+            argv.remove(arg)
+            path = arg.partition("=")[2] or path or DEFAULT_PATH
+    if path:
+        # WATCHLIST_TRACE=1 just means "on"
+        enable(None if path == "1" else path)
+    return is_enabled()
+
+
+def is_enabled():
+    return _events is not None
+
+
+def _now_us():
+    return (time.perf_counter() - _origin) * 1e6
+
+
+def _record(event):
+    thread = threading.current_thread()
+    event.update(pid=os.getpid(), tid=thread.ident)
+    with _lock:
+        if _events is not None:
+            _events.append(event)
+
+
+@contextmanager
+def phase(name, **args):
+    """Record the enclosed block as one phase (a complete trace event).
+
+    args become the event's arguments in the trace viewer; the phase's CPU
+    time (of the calling thread) is added as cpu_ms.
+    """
+    if _events is None:
+        yield
+        return
+    start = _now_us()
+    cpu_start = time.thread_time()
+    try:
+        yield
+    finally:
+        args["cpu_ms"] = round((time.thread_time() - cpu_start) * 1000, 3)
+        _record({"name": name, "ph": "X", "ts": start, "dur": _now_us() - start, "args": args})
+
+
+def mark(name, **args):
+    """Record a single point in time (an instant event), e.g. "window shown"."""
+    if _events is None:
+        return
+    _record({"name": name, "ph": "i", "s": "p", "ts": _now_us(), "args": args})
+
+
+def write():
+    """Save everything recorded so far to the trace file.
+
+    Returns the path written, or None when tracing is off.
+    """
+    if _events is None:
+        return None
+    with _lock:
+        events = list(_events)
+        path = _path
+    names = {t.ident: t.name for t in threading.enumerate()}
+    meta = [
+        {"name": "thread_name", "ph": "M", "pid": os.getpid(), "tid": tid,
+         "args": {"name": names.get(tid, f"thread {tid}")}}
+        for tid in sorted({e["tid"] for e in events})
+    ]
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"traceEvents": meta + events, "displayTimeUnit": "ms"}, f, indent=1)
+    return path
@@ -1,29 +1,134 @@
+import hashlib
+import json
 import os
+import re
 import shutil
 import subprocess
 import sys
 import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
-import requests
+import http_client
+from version import __version__
 
 GITHUB_REPO = "TurtleWithGlasses/movie_watchlist"
 _API_URL = f"https://api.github.com/repos/{GITHUB_REPO}/releases/latest"
 
+# Minimum time between release checks that actually reach GitHub; in between,
+# the last response is reused (see get_latest_release's cache argument).
+RELEASE_CHECK_INTERVAL = 6 * 3600
 
-def get_latest_release():
-    """Return (tag_name, exe_download_url) or (None, None) on any failure."""
+# Update downloads: interrupted transfers resume from the partial file left
+# in the temp dir (also across restarts), and large assets are fetched as
+# several ranges in parallel.
+_CHUNK = 64 * 1024
+DOWNLOAD_RETRIES = 5        # consecutive failures per range before giving up
+DOWNLOAD_BACKOFF = 2.0      # seconds; doubles per consecutive failure
+PARALLEL_MIN_SIZE = 16 * 1024 * 1024
+PARALLEL_SEGMENTS = 4
+
+# Checksum files a release may publish next to the exe, besides
+# "<exe name>.sha256"
+_CHECKSUM_ASSETS = ("sha256sums", "sha256sums.txt", "checksums.txt")
+_SHA256_RE = re.compile(r"[0-9a-fA-F]{64}")
+
+# A release can carry binary patches from earlier versions to its exe, made
+# with make_delta() and named by delta_asset_name().  Applying one needs the
+# optional bsdiff4 package and a published SHA-256 of the exe.
+_DELTA_SUFFIX = ".bsdiff4"
+
+
+def delta_asset_name(exe_name, from_version):
+    """Release asset name of the patch from from_version to exe_name."""
+    return f"{exe_name}.from-{from_version.lstrip('v')}{_DELTA_SUFFIX}"
+
+
+def make_delta(old_exe, new_exe, patch_path):
+    """Write the binary patch turning old_exe into new_exe (release tooling)."""
+    import bsdiff4
+
+    bsdiff4.file_diff(old_exe, new_exe, patch_path)
+
+
+def get_latest_release(cache=None, max_age=RELEASE_CHECK_INTERVAL):
+    """Return (tag_name, exe_download_url, exe_sha256, delta_url), or
+    (None, None, None, None) on any failure.
+
+    exe_sha256 is None when the release publishes no digest for the exe, and
+    delta_url is the patch from the running version, or None if the release
+    has none.
+
+    cache is an optional dict holding the last response ("body", "etag" and
+    "checked_at"), which the caller persists between runs.  A response
+    younger than max_age seconds is reused without any request; otherwise
+    the request is conditional on its ETag, so an unchanged release costs a
+    304 (which GitHub doesn't count against the rate limit).  The exe's
+    SHA-256 is only looked up for a release newer than the running version,
+    and is kept in cache too ("sha256", "sha256_url"), so a published
+    checksum file is downloaded once per release rather than on every
+    check.  cache is updated in place.
+    """
     try:
-        resp = requests.get(_API_URL, timeout=5)
-        if resp.status_code != 200:
-            return None, None
-        data = resp.json()
+        cache = {} if cache is None else cache
+        now = time.time()
+        if cache.get("body") and 0 <= now - float(cache.get("checked_at") or 0) < max_age:
+            data = json.loads(cache["body"])
+        else:
+            resp = http_client.get(_API_URL, timeout=5,
+                                   etag=cache.get("etag") if cache.get("body") else None)
+            if resp.status_code == 304:
+                data = json.loads(cache["body"])
+            elif resp.status_code == 200:
+                data = resp.json()
+                cache["body"] = resp.text
+                cache["etag"] = resp.headers.get("ETag")
+            else:
+                return None, None, None, None
+            cache["checked_at"] = now
         tag = data.get("tag_name", "")
-        for asset in data.get("assets", []):
+        assets = data.get("assets", [])
+        for asset in assets:
             if asset["name"].lower().endswith(".exe"):
-                return tag, asset["browser_download_url"]
-        return tag, None
+                delta_name = delta_asset_name(asset["name"], __version__).lower()
+                delta_url = next((a["browser_download_url"] for a in assets
+                                  if a["name"].lower() == delta_name), None)
+                url = asset["browser_download_url"]
+                sha256 = cache.get("sha256") if cache.get("sha256_url") == url else None
+                if not sha256 and is_newer(__version__, tag):
+                    sha256 = _asset_sha256(asset, assets)
+                    if sha256:
+                        cache["sha256"], cache["sha256_url"] = sha256, url
+                return tag, url, sha256 or None, delta_url
+        return tag, None, None, None
     except Exception:
-        return None, None
+        return None, None, None, None
+
+
+def _asset_sha256(asset, assets):
+    """The published SHA-256 of asset: GitHub's own asset digest, else a
+    checksum file among the release assets.  None if there is neither."""
+    digest = asset.get("digest") or ""
+    if digest.startswith("sha256:"):
+        return digest[len("sha256:"):].lower()
+    by_name = {a["name"].lower(): a for a in assets}
+    for name in (asset["name"].lower() + ".sha256",) + _CHECKSUM_ASSETS:
+        sums = by_name.get(name)
+        if sums is None:
+            continue
+        try:
+            text = http_client.get(sums["browser_download_url"], timeout=10).text
+        except Exception:
+            return None
+        for line in text.splitlines():
+            # "<hex>  <file name>" (sha256sum format) or just "<hex>"
+            fields = line.split()
+            if not fields or not _SHA256_RE.fullmatch(fields[0]):
+                continue
+            if len(fields) == 1 or fields[-1].lstrip("*") == asset["name"]:
+                return fields[0].lower()
+    return None
 
 
 def _parse_version(v):
@@ -38,20 +143,210 @@ def is_newer(current, latest_tag):
         return False
 
 
-def download_update(url, progress_callback=None):
-    """Download the new exe to a temp file. Returns the temp file path."""
-    resp = requests.get(url, stream=True, timeout=120)
-    resp.raise_for_status()
-    total = int(resp.headers.get("content-length", 0))
+def _partial_path(url, suffix=""):
+    """Where the partial download of url is kept between attempts."""
+    key = hashlib.sha1(url.encode("utf-8")).hexdigest()[:12]
+    return os.path.join(tempfile.gettempdir(), f"movie_watchlist_update_{key}{suffix}.part")
+
+
+def _file_size(path):
+    return os.path.getsize(path) if os.path.exists(path) else 0
+
+
+def _probe(url):
+    """(size, ranges supported) of url, from a one-byte range request."""
+    resp = http_client.get(url, headers={"Range": "bytes=0-0"}, stream=True, timeout=30)
+    try:
+        if resp.status_code == 206:
+            size = resp.headers.get("Content-Range", "").rpartition("/")[2]
+            return (int(size) if size.isdigit() else None), True
+        resp.raise_for_status()
+        return int(resp.headers.get("content-length", 0)) or None, False
+    finally:
+        resp.close()
+
+
+class _Progress:
+    """Sums bytes from all ranges of a download into one percentage."""
+
+    def __init__(self, total, callback, already):
+        self.total = total
+        self.callback = callback
+        self.done = already
+        self._lock = threading.Lock()
+
+    def add(self, count):
+        with self._lock:
+            self.done += count
+            percent = int(self.done * 100 / self.total) if self.total else None
+        if self.callback and percent is not None:
+            self.callback(min(max(percent, 0), 100))
+
+
+def _retryable(error):
+    """True if a retry may get past error: a dropped or timed-out connection,
+    or a 429/5xx response.  Other HTTP errors (404, 403, ...) and local file
+    errors are final."""
+    import requests
+
+    if isinstance(error, requests.HTTPError):
+        status = error.response.status_code if error.response is not None else 0
+        return status == 429 or status >= 500
+    return isinstance(error, (requests.ConnectionError, requests.Timeout,
+                              requests.exceptions.ChunkedEncodingError))
+
+
+def _fetch_range(url, path, start, end, progress, hasher=None):
+    """Download bytes start..end (inclusive; end None means to the end) of
+    url into path, continuing after whatever path already holds.
+
+    Dropped connections and 429/5xx responses are retried with exponential
+    backoff, each retry resuming where the last one stopped; other errors
+    are raised straight away.  If hasher is given it is fed the
+    file's bytes in order, including those already on disk; the hasher in
+    use at the end is returned (a new one if the server sent the whole file
+    again).
+    """
+    if hasher is not None and os.path.exists(path):
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                hasher.update(chunk)
+    failures = 0
+    while True:
+        have = _file_size(path)
+        if end is not None and start + have > end:
+            return hasher
+        offset = start + have
+        headers = {}
+        if offset or end is not None:
+            headers["Range"] = f"bytes={offset}-{'' if end is None else end}"
+        try:
+            resp = http_client.get(url, headers=headers, stream=True, timeout=60)
+            try:
+                if resp.status_code == 416 and end is None and have:
+                    return hasher  # nothing past what we already have
+                resp.raise_for_status()
+                mode = "ab"
+                if headers and resp.status_code != 206:
+                    if start:
+                        raise ValueError("the server does not support range requests")
+                    # The whole file came back instead of the range: start over
+                    mode = "wb"
+                    hasher = hashlib.sha256() if hasher is not None else None
+                    progress.add(-have)
+                with open(path, mode) as f:
+                    for chunk in resp.iter_content(chunk_size=_CHUNK):
+                        f.write(chunk)
+                        if hasher is not None:
+                            hasher.update(chunk)
+                        progress.add(len(chunk))
+            finally:
+                resp.close()
+            if end is None or start + _file_size(path) > end:
+                return hasher
+            # The stream ended short without an error; go round and resume
+        except OSError as e:  # includes requests' connection and HTTP errors
+            failures += 1
+            if failures > DOWNLOAD_RETRIES or not _retryable(e):
+                raise
+            time.sleep(min(DOWNLOAD_BACKOFF * 2 ** (failures - 1), 60))
+
+
+def _patch_update(delta_url, sha256, progress_callback):
+    """Build the new exe from the running one and a downloaded patch.
+
+    Returns the temp file path of the result once its SHA-256 matches.
+    Raises if anything fails.
+    """
+    import bsdiff4
+
+    partial = _partial_path(delta_url)
+    total, ranges = _probe(delta_url)
+    # Downloading the patch is most of the work; patching takes the last 10%
+    progress = _Progress(total, lambda p: progress_callback and progress_callback(p * 9 // 10),
+                         _file_size(partial))
+    _fetch_range(delta_url, partial, 0, total - 1 if total and ranges else None, progress)
+
     tmp_fd, tmp_path = tempfile.mkstemp(suffix="_update.exe")
-    downloaded = 0
-    with os.fdopen(tmp_fd, "wb") as f:
-        for chunk in resp.iter_content(chunk_size=65536):
-            if chunk:
-                f.write(chunk)
-                downloaded += len(chunk)
-                if progress_callback and total:
-                    progress_callback(int(downloaded * 100 / total))
+    os.close(tmp_fd)
+    try:
+        bsdiff4.file_patch(os.path.abspath(sys.executable), tmp_path, partial)
+        hasher = hashlib.sha256()
+        with open(tmp_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                hasher.update(chunk)
+        if hasher.hexdigest() != sha256.lower():
+            raise ValueError("patched exe failed its SHA-256 check")
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    finally:
+        os.remove(partial)
+    if progress_callback:
+        progress_callback(100)
+    return tmp_path
+
+
+def download_update(url, progress_callback=None, sha256=None, segments=None, delta_url=None):
+    """Download the new exe to a temp file. Returns the temp file path.
+
+    With delta_url (see get_latest_release), the new exe is first built from
+    the running one plus that much smaller patch.  That needs the bsdiff4
+    package, a frozen build and sha256 to check the result against.  If any
+    of that is missing or the patch fails, the full exe is downloaded as
+    below.
+
+    The download continues from the partial file of an earlier attempt, if
+    any, using HTTP Range requests.  segments ranges are fetched in
+    parallel; by default that is PARALLEL_SEGMENTS for assets of at least
+    PARALLEL_MIN_SIZE whose server supports ranges, else one.  A SHA-256 is
+    computed along the way; if sha256 is given and doesn't match, the
+    partial file is discarded and ValueError is raised.
+    """
+    if delta_url and sha256 and getattr(sys, "frozen", False):
+        try:
+            return _patch_update(delta_url, sha256, progress_callback)
+        except Exception as e:
+            print(f"Delta update failed, downloading the full exe: {e}")
+
+    partial = _partial_path(url)
+    total, ranges = _probe(url)
+    if segments is None:
+        segments = PARALLEL_SEGMENTS if total and total >= PARALLEL_MIN_SIZE else 1
+    if not (ranges and total) or os.path.exists(partial):
+        segments = 1  # can't split, or a single-stream download is half done
+
+    if segments == 1:
+        progress = _Progress(total, progress_callback, _file_size(partial))
+        hasher = _fetch_range(url, partial, 0, total - 1 if total and ranges else None,
+                              progress, hashlib.sha256())
+    else:
+        step = -(-total // segments)
+        bounds = [(i, min(i + step, total) - 1) for i in range(0, total, step)]
+        pieces = [_partial_path(url, f".{len(bounds)}seg{n}") for n in range(len(bounds))]
+        progress = _Progress(total, progress_callback, sum(_file_size(p) for p in pieces))
+        with ThreadPoolExecutor(max_workers=len(pieces)) as pool:
+            futures = [pool.submit(_fetch_range, url, piece, first, last, progress)
+                       for piece, (first, last) in zip(pieces, bounds)]
+            for future in futures:
+                future.result()
+        # Join the pieces, hashing them in file order
+        hasher = hashlib.sha256()
+        with open(partial, "wb") as out:
+            for piece in pieces:
+                with open(piece, "rb") as f:
+                    for chunk in iter(lambda: f.read(1 << 20), b""):
+                        hasher.update(chunk)
+                        out.write(chunk)
+        for piece in pieces:
+            os.remove(piece)
+
+    if sha256 and hasher.hexdigest() != sha256.lower():
+        os.remove(partial)
+        raise ValueError("The downloaded update failed its SHA-256 check; please try again.")
+    tmp_fd, tmp_path = tempfile.mkstemp(suffix="_update.exe")
+    os.close(tmp_fd)
+    os.replace(partial, tmp_path)
     return tmp_path
 
 
@@ -113,23 +408,30 @@ def do_staged_update():
         return False
 
     # Step 3 — launch the new exe with a clean environment.
-    # PyInstaller adds its _MEI temp dir to PATH; the child must not inherit
-    # it because that dir will be deleted when this process exits, which
-    # breaks Qt's platform-plugin lookup in the new process.
     try:
-        env = os.environ.copy()
-        meipass = getattr(sys, "_MEIPASS", None)
-        if meipass:
-            parts = env.get("PATH", "").split(os.pathsep)
-            env["PATH"] = os.pathsep.join(p for p in parts if p != meipass)
-        env.pop("QT_QPA_PLATFORM_PLUGIN_PATH", None)
-        env.pop("QT_PLUGIN_PATH", None)
-        subprocess.Popen([current_exe], env=env, cwd=current_dir)
+        subprocess.Popen([current_exe], env=child_env(), cwd=current_dir)
     except Exception:
         pass
     return True
 
 
+def child_env():
+    """
+    Environment for a child process started from this one.
+    PyInstaller adds its _MEI temp dir to PATH; the child must not inherit
+    it because that dir will be deleted when this process exits, which
+    breaks Qt's platform-plugin lookup in the new process.
+    """
+    env = os.environ.copy()
+    meipass = getattr(sys, "_MEIPASS", None)
+    if meipass:
+        parts = env.get("PATH", "").split(os.pathsep)
+        env["PATH"] = os.pathsep.join(p for p in parts if p != meipass)
+    env.pop("QT_QPA_PLATFORM_PLUGIN_PATH", None)
+    env.pop("QT_PLUGIN_PATH", None)
+    return env
+
+
 def cleanup_old_version():
     """
     Delete _old_version.exe if it exists (left over from a previous update).